@@ -0,0 +1,474 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:
+    raise ImportError("AsyncAzureDevOpsHistoryAnalyzer requires aiohttp (pip install aiohttp)")
+
+from AzureDevOpsAnalyzerBase import AzureDevOpsAnalyzerBase
+from StateTimeline import StateTimeline
+from Task import Task
+from TaskCollection import TaskCollection
+
+
+class AsyncAzureDevOpsHistoryAnalyzer(AzureDevOpsAnalyzerBase):
+    """asyncio counterpart of AzureDevOpsHistoryAnalyzer
+
+    The fetchers are coroutines sharing one aiohttp session, with the number of requests in
+    flight bounded by a semaphore. Pass the same session and semaphore to several analyzers to
+    analyze many projects and queries from one event loop under a common limit. Cache, history
+    store, lean updates and instrumentation work as in the synchronous analyzer; the reporting
+    history backend is not available.
+
+    Tasks cannot load themselves through a coroutine, so they must be loaded before their
+    properties are read: get_all_tasks returns them loaded, and load_metrics loads any others.
+    """
+
+    is_async = True
+
+    def __init__(self, organization: str, project: str, personal_access_token: str, tasks_id_query_id: str,
+                 max_concurrency: int = 16, session: Optional['aiohttp.ClientSession'] = None,
+                 semaphore: Optional[asyncio.Semaphore] = None, history_backend: str = 'updates', **kwargs):
+        """
+        Initialize the async Azure DevOps API client
+
+        Args:
+            organization: Your Azure DevOps organization name
+            project: Your project name
+            personal_access_token: Your PAT for authentication
+            tasks_id_query_id: Query ID for getting task IDs
+            max_concurrency: Maximum number of requests in flight (ignored if a semaphore is given)
+            session: Shared aiohttp session (one is created on first use and closed by close() otherwise)
+            semaphore: Shared semaphore bounding requests across analyzers
+            history_backend: Only 'updates' is supported
+            **kwargs: Other options shared with AzureDevOpsHistoryAnalyzer, e.g. history_store or lean_updates
+        """
+        if history_backend != 'updates':
+            raise ValueError(f"Unsupported history backend {history_backend!r} for the async analyzer, "
+                             f"only 'updates' is available")
+
+        super().__init__(organization, project, personal_access_token, tasks_id_query_id, **kwargs)
+        self.client = session
+        self._owns_client = session is None
+        self.semaphore = semaphore or asyncio.Semaphore(max_concurrency)
+        connect, read = self.timeout
+        self.client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        # Details and timelines being fetched, so concurrent loads of the same item wait instead of refetching
+        self._inflight_details: Dict[int, asyncio.Future] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+
+    async def __aenter__(self) -> 'AsyncAzureDevOpsHistoryAnalyzer':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the aiohttp session if this analyzer created it"""
+        if self._owns_client and self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    def _client(self) -> 'aiohttp.ClientSession':
+        # Sessions must be created inside the running event loop
+        if self.client is None:
+            self.client = aiohttp.ClientSession()
+        return self.client
+
+    async def _request(self, method: str, url: str, params: Optional[Dict] = None,
+                       body: Optional[Dict] = None) -> Tuple[int, Dict]:
+        """
+        Send a request through the shared session, retrying on 429, transient 5xx responses and timeouts
+
+        Authentication is sent per request, so one session can serve analyzers of different organizations.
+
+        Args:
+            method: HTTP method
+            url: The URL to request
+            params: Optional query parameters
+            body: Optional JSON body
+
+        Returns:
+            Tuple of (status, JSON body) of the last response; status is 0 if no response arrived
+        """
+        endpoint = self._endpoint_name(url)
+        if params is not None:
+            params = {name: str(value) for name, value in params.items()}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    # Time spent waiting for a slot is not request latency
+                    start = time.perf_counter()
+                    async with self._client().request(method, url, params=params, json=body, headers=self.headers,
+                                                      timeout=self.client_timeout) as response:
+                        content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.instrumentation.record_request(endpoint, time.perf_counter() - start, 0, 0)
+                if attempt == self.max_retries:
+                    return 0, {'message': str(e) or type(e).__name__}
+                self.instrumentation.record_retry(endpoint, 0)
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+
+            # Content-Length is the encoded size; without it only the decoded body size is known
+            size = response.content_length if response.content_length is not None else len(content)
+            self.instrumentation.record_request(endpoint, time.perf_counter() - start, size, response.status)
+            if response.status not in self.RETRY_STATUS_CODES or attempt == self.max_retries:
+                try:
+                    return response.status, json.loads(content) if content else {}
+                except ValueError:
+                    return response.status, {'message': content.decode('utf-8', 'replace')}
+            self.instrumentation.record_retry(endpoint, response.status)
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def get_work_item_details(self, work_item_id: int) -> Dict:
+        """
+        Get basic details about a work item (title, type, current state)
+
+        Args:
+            work_item_id: The ID of the work item
+
+        Returns:
+            Dictionary with work item details
+        """
+        cached = self.cache.get_details(work_item_id)
+        self.instrumentation.record_cache('details', cached is not None)
+        if cached is not None:
+            return cached
+
+        url = f"{self.base_url}/wit/workItems/{work_item_id}"
+        status, data = await self._request('GET', url, params={'api-version': '7.0', '$expand': 'fields'})
+        if status != 200:
+            print(f"Error fetching details for work item {work_item_id}: {status} {data.get('message', '')}")
+            return {}
+
+        details = self._details_from_fields(work_item_id, data['fields'])
+        self._store_details(work_item_id, details)
+        return details
+
+    async def get_work_items_details_batch(self, work_item_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Get details for many work items through the workitemsbatch endpoint, 200 IDs per concurrent request
+
+        Args:
+            work_item_ids: IDs of the work items
+
+        Returns:
+            Dictionary mapping work item ID to its details
+        """
+        results = {}
+        owned = {}
+        waiting = {}
+        loop = asyncio.get_running_loop()
+        for work_item_id in work_item_ids:
+            cached = self.cache.get_details(work_item_id)
+            self.instrumentation.record_cache('details', cached is not None)
+            if cached is not None:
+                results[work_item_id] = cached
+            elif work_item_id in self._inflight_details:
+                waiting[work_item_id] = self._inflight_details[work_item_id]
+            elif work_item_id not in owned:
+                owned[work_item_id] = self._inflight_details[work_item_id] = loop.create_future()
+        missing = list(owned)
+
+        url = f"{self.base_url}/wit/workitemsbatch"
+
+        async def fetch(chunk: List[int]):
+            body = {
+                'ids': chunk,
+                'fields': self.DETAIL_FIELDS,
+                'errorPolicy': 'omit'
+            }
+            status, data = await self._request('POST', url, params={'api-version': '7.0'}, body=body)
+            if status != 200:
+                print(f"Error fetching details for {len(chunk)} work items: {status} {data.get('message', '')}")
+                return
+
+            for item in data.get('value', []):
+                if not item:
+                    continue
+                details = self._details_from_fields(item['id'], item.get('fields', {}))
+                self._store_details(item['id'], details)
+                results[item['id']] = details
+
+        try:
+            await asyncio.gather(*(fetch(missing[start:start + self.BATCH_SIZE])
+                                   for start in range(0, len(missing), self.BATCH_SIZE)))
+        finally:
+            for work_item_id, future in owned.items():
+                del self._inflight_details[work_item_id]
+                future.set_result(results.get(work_item_id))
+
+        for work_item_id, future in waiting.items():
+            # Shielded, so a cancelled caller does not cancel the fetch other callers wait on
+            details = await asyncio.shield(future)
+            if details is not None:
+                results[work_item_id] = details
+        return results
+
+    async def _fetch_updates(self, work_item_id: int, skip: int = 0) -> Optional[Dict]:
+        """Fetch the updates of a work item from the given revision on (see AzureDevOpsHistoryAnalyzer._fetch_updates)"""
+        url = f"{self.base_url}/wit/workItems/{work_item_id}/updates"
+        value = []
+        revisions = 0
+        rev = None
+
+        while True:
+            params = {
+                'api-version': '7.0',
+                '$top': self.UPDATES_PAGE_SIZE
+            }
+            if skip + revisions:
+                params['$skip'] = skip + revisions
+
+            status, data = await self._request('GET', url, params=params)
+            if status != 200:
+                print(f"Error fetching updates for work item {work_item_id}: {status} {data.get('message', '')}")
+                return None
+            page = data.get('value', [])
+
+            revisions += len(page)
+            if page:
+                rev = page[-1].get('rev', rev)
+            if self.lean_updates:
+                value.extend(update for update in map(self._lean_update, page) if update is not None)
+            else:
+                value.extend(page)
+
+            if len(page) < self.UPDATES_PAGE_SIZE:
+                return {'count': len(value), 'value': value, 'revisions': revisions, 'rev': rev}
+
+    async def get_work_item_updates(self, work_item_id: int) -> Dict:
+        """
+        Get all updates/revisions for a specific work item
+
+        Args:
+            work_item_id: The ID of the work item
+
+        Returns:
+            Dictionary containing the API response with all updates
+        """
+        cached = self.cache.get_updates(work_item_id)
+        self.instrumentation.record_cache('updates', cached is not None)
+        if cached is not None:
+            return cached
+
+        stored_rev, stored_updates, current = None, None, False
+        if self.history_store is not None:
+            # SQLite calls block, so they run off the event loop
+            stored_rev, stored_updates, current = await asyncio.to_thread(self._stored_updates, work_item_id)
+            if current:
+                return stored_updates
+
+        skip = self._revision_count(stored_updates) if stored_updates is not None else 0
+        updates = await self._fetch_updates(work_item_id, skip)
+        if updates is None:
+            return {}
+        if self.history_store is not None:
+            return await asyncio.to_thread(self._store_updates, work_item_id, updates, stored_rev, stored_updates)
+        return self._store_updates(work_item_id, updates, stored_rev, stored_updates)
+
+    async def get_state_timeline(self, work_item_id: int) -> StateTimeline:
+        """
+        Get the (state, timestamp) timeline of a work item, built once from its updates
+
+        Args:
+            work_item_id: The ID of the work item
+
+        Returns:
+            StateTimeline for the work item (empty if its updates could not be fetched)
+        """
+        timeline = await self._load_timeline(work_item_id)
+        return timeline if timeline is not None else StateTimeline()
+
+    async def _load_timeline(self, work_item_id: int) -> Optional[StateTimeline]:
+        """The timeline of a work item from the cache or its updates, or None if the fetch failed"""
+        cached = self.cache.get_timeline(work_item_id)
+        self.instrumentation.record_cache('timeline', cached is not None)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(work_item_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = self._inflight[work_item_id] = asyncio.get_running_loop().create_future()
+        try:
+            timeline = self._build_timeline(work_item_id, await self.get_work_item_updates(work_item_id))
+            future.set_result(timeline)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # The owner raises it; waiters, if any, get it too
+            future.exception()
+            raise
+        finally:
+            del self._inflight[work_item_id]
+        return timeline
+
+    async def get_query_wiql(self, query_id: Optional[str] = None) -> Optional[str]:
+        """
+        Get the WIQL text of a saved query
+
+        Args:
+            query_id: ID of the saved query (defaults to the configured query)
+
+        Returns:
+            The WIQL text, or None on error
+        """
+        query_id = query_id or self.tasks_id_query_id
+        url = f"{self.base_url}/wit/queries/{query_id}"
+        status, data = await self._request('GET', url, params={'api-version': '7.0', '$expand': 'wiql'})
+        if status != 200:
+            print(f"Error fetching query {query_id}: {status} {data.get('message', '')}")
+            return None
+        return data.get('wiql')
+
+    async def run_wiql(self, wiql: str, top: Optional[int] = None, time_precision: bool = False) -> Optional[List[int]]:
+        """
+        Run an ad-hoc WIQL query
+
+        Args:
+            wiql: The WIQL query text
+            top: Maximum number of work items to return
+            time_precision: Compare dates including their time of day, not just the date
+
+        Returns:
+            List with work item IDs, or None on error
+        """
+        params = {
+            'api-version': '7.0'
+        }
+        if top is not None:
+            params['$top'] = top
+        if time_precision:
+            params['timePrecision'] = 'true'
+
+        status, data = await self._request('POST', f"{self.base_url}/wit/wiql", params=params, body={'query': wiql})
+        if status != 200:
+            print(f"Error running WIQL query: {status} {data.get('message', '')}")
+            return None
+        return [item['id'] for item in data.get('workItems', [])]
+
+    async def page_task_ids(self, wiql: Optional[str] = None, page_size: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Get all IDs of a flat query page by page, in ascending ID order (see iter_task_ids)
+
+        Args:
+            wiql: WIQL text to page through (defaults to the configured saved query)
+            page_size: Work items per page
+
+        Returns:
+            List with Task IDs, or None if any request failed
+        """
+        page_size = page_size or self.WIQL_PAGE_SIZE
+        if wiql is None:
+            wiql = await self.get_query_wiql()
+            if wiql is None:
+                return None
+
+        task_ids = []
+        after_id = 0
+        while True:
+            page = await self.run_wiql(self._page_wiql(wiql, after_id), top=page_size)
+            if page is None:
+                return None
+            if not page:
+                return task_ids
+            task_ids.extend(page)
+            if len(page) < page_size:
+                return task_ids
+            after_id = page[-1]
+
+    async def get_task_ids(self, query_id: Optional[str] = None) -> Optional[List[int]]:
+        """
+        Get Task IDs from a saved query
+
+        Args:
+            query_id: ID of the saved query (defaults to the configured query)
+
+        Returns:
+            List with Task IDs, or None if the query failed
+        """
+        query_id = query_id or self.tasks_id_query_id
+        url = f'{self.base_url}/wit/wiql/{query_id}'
+        status, data = await self._request('GET', url, params={'api-version': '6.0'})
+
+        if status == 200:
+            task_ids = [item['id'] for item in data.get('workItems', [])]
+            print(f"Found {len(task_ids)} work items")
+            if len(task_ids) >= self.WIQL_MAX_RESULTS:
+                print("Query result may be capped, paging through it by ID")
+                task_ids = await self._page_saved_query(query_id)
+            return task_ids
+
+        if 'VS402337' in data.get('message', ''):
+            print("Query exceeds the WIQL size limit, paging through it by ID")
+            return await self._page_saved_query(query_id)
+
+        print(f"Error: {status}")
+        print(data.get('message', ''))
+        return None
+
+    async def _page_saved_query(self, query_id: str) -> Optional[List[int]]:
+        """All IDs of a saved query, paged by ID, or None if any request failed"""
+        wiql = await self.get_query_wiql(query_id)
+        return await self.page_task_ids(wiql) if wiql is not None else None
+
+    async def prefetch(self, task_ids: List[int]) -> Tuple[Dict[int, Dict], Dict[int, StateTimeline]]:
+        """
+        Fetch details and state timelines for many work items concurrently and store them in the cache
+
+        Args:
+            task_ids: IDs of the work items to fetch
+
+        Returns:
+            Tuple of (details, timelines), each a dictionary keyed by work item ID that only holds
+            the items fetched successfully
+        """
+        details = await self.get_work_items_details_batch(task_ids)
+        timelines = await asyncio.gather(*(self._load_timeline(task_id) for task_id in task_ids))
+        return details, {task_id: timeline for task_id, timeline in zip(task_ids, timelines) if timeline is not None}
+
+    async def get_all_tasks(self) -> TaskCollection:
+        """
+        Get all tasks of the configured query with details and timelines loaded
+
+        Returns:
+            TaskCollection of Task objects
+        """
+        with self.instrumentation.phase('get_all_tasks'):
+            task_ids = await self.get_task_ids() or []
+            tasks = TaskCollection([Task(task_id, self) for task_id in task_ids], self)
+            await self.load_metrics(tasks)
+            return tasks
+
+    async def load_metrics(self, tasks: List[Task]) -> List[Task]:
+        """
+        Load whatever tasks are missing concurrently, then compute the metrics of every task
+
+        Call it again after appending to or refreshing a collection.
+
+        Args:
+            tasks: Task objects, e.g. created by ID with this analyzer
+
+        Returns:
+            The same tasks, ready for their properties to be read without blocking
+        """
+        pending = [task for task in tasks if not task.loaded]
+        details, timelines = await self.prefetch([task.id for task in pending])
+        for task in pending:
+            # Items that failed to load keep an empty placeholder, like the synchronous analyzer
+            task.set_data(task._details if task._details is not None else details.get(task.id, {}),
+                          task._timeline if task._timeline is not None else timelines.get(task.id, StateTimeline()))
+
+        # Reading one metric computes all of a task's metrics in one pass
+        for task in tasks:
+            task.cycle_time
+        return tasks
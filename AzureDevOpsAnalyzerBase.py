@@ -0,0 +1,309 @@
+import base64
+import random
+import re
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+from HistoryStore import HistoryStore
+from Instrumentation import Instrumentation
+from StateTimeline import StateTimeline
+from WorkItemCache import WorkItemCache
+
+
+class AzureDevOpsAnalyzerBase:
+    """Configuration, caches and request-independent helpers shared by the sync and async analyzers
+
+    Nothing here performs I/O: AzureDevOpsHistoryAnalyzer adds blocking fetchers on a requests
+    session, AsyncAzureDevOpsHistoryAnalyzer coroutines on an aiohttp session.
+    """
+
+    # Status codes worth retrying: throttling and transient server errors
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    # The workitemsbatch endpoint accepts at most 200 IDs per request
+    BATCH_SIZE = 200
+    # WIQL refuses queries returning more than 20,000 work items
+    WIQL_MAX_RESULTS = 20000
+    # Work items per page when paging through large query results
+    WIQL_PAGE_SIZE = 5000
+    # Only the fields Task exposes through its details
+    DETAIL_FIELDS = ['System.Title', 'System.WorkItemType', 'System.State', 'System.CreatedDate', 'System.Rev']
+    # Revisions per /updates page; items with longer histories are fetched in several pages
+    UPDATES_PAGE_SIZE = 200
+    # Fields of a revision kept in lean mode, enough to build the state timeline
+    LEAN_UPDATE_FIELDS = ('System.State', 'System.ChangedDate')
+
+    # Whether the fetchers are coroutines; Tasks cannot lazy load through such an analyzer
+    is_async = False
+
+    def __init__(self, organization: str, project: str, personal_access_token: str, tasks_id_query_id: str,
+                 cache_size: Optional[int] = 10000, max_retries: int = 5, backoff_factor: float = 0.5,
+                 history_store: Optional[HistoryStore] = None, timeout: Tuple[float, float] = (10, 60),
+                 host: str = 'https://dev.azure.com', keep_raw_updates: bool = True,
+                 instrumentation: Optional[Instrumentation] = None, lean_updates: bool = False,
+                 cache: Optional[WorkItemCache] = None):
+        """Initialize the state shared by both analyzers (see AzureDevOpsHistoryAnalyzer for the arguments)"""
+        self.organization = organization
+        self.project = project
+        self.base_url = f"{host}/{organization}/{project}/_apis"
+        self.tasks_id_query_id = tasks_id_query_id
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+
+        # Create basic auth header
+        auth_string = f":{personal_access_token}"
+        auth_bytes = auth_string.encode('ascii')
+        auth_b64 = base64.b64encode(auth_bytes).decode('ascii')
+
+        self.headers = {
+            'Authorization': f'Basic {auth_b64}',
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip, deflate'
+        }
+
+        # Details and updates are fetched once per work item and shared by every metric and Task
+        self.cache = cache if cache is not None else WorkItemCache(max_items=cache_size)
+        self.history_store = history_store
+        self.keep_raw_updates = keep_raw_updates
+        self.instrumentation = instrumentation or Instrumentation()
+        self.lean_updates = lean_updates
+
+    def invalidate(self, work_item_id: int):
+        """
+        Drop cached details and updates for a work item so they are fetched again on next access
+
+        The persistent history store is left alone; its updates are revalidated by revision number.
+
+        Args:
+            work_item_id: The ID of the work item
+        """
+        self.cache.invalidate(work_item_id)
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """Seconds to wait before the next attempt, honoring Retry-After when the server sends it"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return max(0.0, float(retry_after))
+                except ValueError:
+                    pass
+        # Full jitter keeps parallel workers from retrying in lockstep
+        return random.uniform(0, self.backoff_factor * (2 ** attempt))
+
+    @staticmethod
+    def _endpoint_name(url: str) -> str:
+        """Short endpoint name of an API URL, used to group request metrics"""
+        # Only the part after /_apis/, so organization and project names cannot match an endpoint
+        path = urllib.parse.urlparse(url).path.partition('/_apis/')[2]
+        if path.endswith('/updates'):
+            return 'updates'
+        for name in ('workitemsbatch', 'wiql', 'queries', 'workItems', 'reporting'):
+            if f'/{name}' in f'/{path}':
+                return name
+        return 'other'
+
+    def _stored_updates(self, work_item_id: int) -> Tuple[Optional[int], Optional[Dict], bool]:
+        """
+        Look up the updates of a work item in the history store
+
+        Args:
+            work_item_id: The ID of the work item
+
+        Returns:
+            Tuple of (rev, updates, current): the stored revision and updates (None if nothing is
+            stored) and whether they are still current, in which case they are also cached
+        """
+        if self.history_store is None:
+            return None, None, False
+        stored = self.history_store.get(work_item_id)
+        if stored is None or stored[1] is None:
+            return None, None, False
+
+        stored_rev, stored_updates = stored
+        # Details loaded this run carry the current revision; an unchanged item needs no request
+        details = self.cache.get_details(work_item_id)
+        current = bool(details and details.get('rev') is not None and details['rev'] == stored_rev)
+        self.instrumentation.record_cache('history_store', current)
+        if current:
+            self.cache.put_updates(work_item_id, stored_updates)
+        return stored_rev, stored_updates, current
+
+    def _store_updates(self, work_item_id: int, updates: Dict, stored_rev: Optional[int],
+                       stored_updates: Optional[Dict]) -> Dict:
+        """
+        Append freshly fetched updates to the stored history, then cache and persist the result
+
+        Args:
+            work_item_id: The ID of the work item
+            updates: Result of _fetch_updates
+            stored_rev: Revision of the stored history
+            stored_updates: Stored history the fetch continued from, or None
+
+        Returns:
+            The complete updates payload
+        """
+        rev = updates.pop('rev')
+        if stored_updates is not None:
+            if rev is None:
+                rev = stored_rev
+            value = stored_updates.get('value', []) + updates['value']
+            updates = {'count': len(value), 'value': value,
+                       'revisions': self._revision_count(stored_updates) + updates['revisions']}
+        # Stored payloads may be reused in either mode, so the $skip position is always kept
+        updates['rev'] = rev
+
+        if self.history_store is not None:
+            self.history_store.put_updates(work_item_id, rev, updates)
+
+        self.cache.put_updates(work_item_id, updates)
+        return updates
+
+    @staticmethod
+    def _revision_count(updates: Dict) -> int:
+        """Number of revisions an updates payload covers, including those dropped in lean mode"""
+        return updates.get('revisions', len(updates.get('value', [])))
+
+    def _lean_update(self, update: Dict) -> Optional[Dict]:
+        """Reduce a revision to what the state timeline needs, or None if it does not change the state"""
+        fields = update.get('fields')
+        if not fields or 'System.State' not in fields:
+            return None
+        return {
+            'rev': update.get('rev'),
+            'revisedDate': update.get('revisedDate'),
+            'fields': {name: fields[name] for name in self.LEAN_UPDATE_FIELDS if name in fields}
+        }
+
+    def _build_timeline(self, work_item_id: int, updates: Dict) -> Optional[StateTimeline]:
+        """Build and cache the timeline of fetched updates, or None if the fetch failed"""
+        # A failed fetch is not cached so the next access tries again
+        if not updates:
+            return None
+        with self.instrumentation.phase('parse_timelines'):
+            timeline = StateTimeline.from_updates(updates)
+        self.cache.put_timeline(work_item_id, timeline)
+        if not self.keep_raw_updates:
+            self.cache.discard_updates(work_item_id)
+        return timeline
+
+    def _details_from_fields(self, work_item_id: int, fields: Dict) -> Dict:
+        """Build the details dictionary Task expects from a work item's fields"""
+        return {
+            'id': work_item_id,
+            'title': fields.get('System.Title', 'N/A'),
+            'type': fields.get('System.WorkItemType', 'N/A'),
+            'state': fields.get('System.State', 'N/A'),
+            'created': fields.get('System.CreatedDate', 'N/A'),
+            'rev': fields.get('System.Rev')
+        }
+
+    def _store_details(self, work_item_id: int, details: Dict):
+        """Put details in the in-memory cache"""
+        self.cache.put_details(work_item_id, details)
+
+    @staticmethod
+    def add_wiql_condition(wiql: str, condition: str, order_by: Optional[str] = None) -> str:
+        """
+        AND an extra condition into a flat WIQL query
+
+        Args:
+            wiql: The WIQL query text
+            condition: WIQL condition, e.g. "[System.Id] > 100"
+            order_by: Optional ORDER BY clause replacing the query's own, e.g. "[System.Id]"
+
+        Returns:
+            The rewritten WIQL text
+        """
+        # ASOF is the last clause and must stay last
+        asof = ''
+        asof_match = re.search(r"\bASOF\b.*$", wiql, re.IGNORECASE | re.DOTALL)
+        if asof_match:
+            asof = ' ' + asof_match.group(0).strip()
+            wiql = wiql[:asof_match.start()]
+
+        order = ''
+        order_match = re.search(r"\bORDER\s+BY\b.*$", wiql, re.IGNORECASE | re.DOTALL)
+        if order_match:
+            order = ' ' + order_match.group(0).strip()
+            wiql = wiql[:order_match.start()]
+        if order_by is not None:
+            order = f" ORDER BY {order_by}"
+
+        where_match = re.search(r"\bWHERE\b", wiql, re.IGNORECASE)
+        if where_match:
+            conditions = wiql[where_match.end():].strip()
+            wiql = f"{wiql[:where_match.end()]} ({conditions}) AND {condition}"
+        else:
+            wiql = f"{wiql.rstrip()} WHERE {condition}"
+
+        return f"{wiql}{order}{asof}"
+
+    @staticmethod
+    def _wiql_literal(value: str) -> str:
+        """Quote a string for WIQL"""
+        return "'" + str(value).replace("'", "''") + "'"
+
+    @classmethod
+    def _wiql_date(cls, value: Union[datetime, timedelta, str]) -> str:
+        """A WIQL date literal; a timedelta is counted back from now"""
+        if isinstance(value, timedelta):
+            value = datetime.now(timezone.utc) - value
+        if isinstance(value, datetime):
+            # Dates without a time of day work without timePrecision
+            value = value.strftime('%Y-%m-%d')
+        return cls._wiql_literal(value)
+
+    @classmethod
+    def build_wiql(cls, changed_since: Union[datetime, timedelta, str, None] = None,
+                   changed_before: Union[datetime, timedelta, str, None] = None,
+                   closed_since: Union[datetime, timedelta, str, None] = None,
+                   closed_before: Union[datetime, timedelta, str, None] = None,
+                   types: Optional[List[str]] = None, area_paths: Optional[List[str]] = None,
+                   states: Optional[List[str]] = None, base_wiql: Optional[str] = None) -> str:
+        """
+        Build a flat WIQL query from filters, so work items outside them are never fetched
+
+        Dates are compared by day; a timedelta means that long before now, e.g. timedelta(days=90).
+
+        Args:
+            changed_since: Only items changed on or after this date
+            changed_before: Only items last changed before this date
+            closed_since: Only items closed on or after this date
+            closed_before: Only items closed before this date
+            types: Work item types, e.g. ['Task', 'Bug']
+            area_paths: Area paths; items under any of them match
+            states: Current states, e.g. ['Active', 'Resolved']
+            base_wiql: Query to narrow down (defaults to all work items of the project)
+
+        Returns:
+            The WIQL text, for get_all_tasks, iter_task_ids or run_wiql
+        """
+        conditions = []
+        if changed_since is not None:
+            conditions.append(f"[System.ChangedDate] >= {cls._wiql_date(changed_since)}")
+        if changed_before is not None:
+            conditions.append(f"[System.ChangedDate] < {cls._wiql_date(changed_before)}")
+        if closed_since is not None:
+            conditions.append(f"[Microsoft.VSTS.Common.ClosedDate] >= {cls._wiql_date(closed_since)}")
+        if closed_before is not None:
+            conditions.append(f"[Microsoft.VSTS.Common.ClosedDate] < {cls._wiql_date(closed_before)}")
+        if types:
+            conditions.append(f"[System.WorkItemType] IN ({', '.join(map(cls._wiql_literal, types))})")
+        if states:
+            conditions.append(f"[System.State] IN ({', '.join(map(cls._wiql_literal, states))})")
+        if area_paths:
+            under = ' OR '.join(f"[System.AreaPath] UNDER {cls._wiql_literal(path)}" for path in area_paths)
+            conditions.append(f"({under})" if len(area_paths) > 1 else under)
+
+        if base_wiql is None:
+            base_wiql = "SELECT [System.Id] FROM WorkItems WHERE [System.TeamProject] = @project"
+        if not conditions:
+            return base_wiql
+        return cls.add_wiql_condition(base_wiql, ' AND '.join(conditions))
+
+    @classmethod
+    def _page_wiql(cls, wiql: str, after_id: int) -> str:
+        """Restrict a flat WIQL query to IDs above after_id, ordered by ID"""
+        return cls.add_wiql_condition(wiql, f"[System.Id] > {after_id}", order_by="[System.Id]")
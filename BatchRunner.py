@@ -0,0 +1,152 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+from FlowAnalytics import FlowAnalytics
+from HistoryStore import HistoryStore
+from Instrumentation import Instrumentation
+from Task import Task
+from TaskGraphVisualizer import TaskGraphVisualizer
+from WorkItemCache import WorkItemCache
+from main import AzureDevOpsHistoryAnalyzer, parse_query_url
+
+
+class BatchRunner:
+    """Runs many team queries and projects against shared data, fetching every work item once
+
+    All queries are resolved to work item IDs first. IDs are then deduplicated per organization
+    (work item IDs are unique within one), each unique item is fetched once through the analyzer of
+    the first query that returned it, and every team's chart and metrics are built from the shared
+    Task objects. Analyzers of the same organization share one cache (and history store).
+    """
+
+    def __init__(self, queries: Union[List[str], Dict[str, str]], personal_access_token: str,
+                 output_dir: str = 'reports', cache_dir: Optional[str] = None, cache_size: Optional[int] = None,
+                 **analyzer_kwargs):
+        """
+        Initialize the runner
+
+        Args:
+            queries: Query or project URLs (see parse_query_url), or a dictionary of team name to URL
+            personal_access_token: PAT with access to every organization queried
+            output_dir: Directory charts are written to
+            cache_dir: Optional directory for one persistent history store per organization
+            cache_size: Maximum number of work items cached per organization (None for unbounded)
+            **analyzer_kwargs: Other AzureDevOpsHistoryAnalyzer options, e.g. lean_updates
+        """
+        if not isinstance(queries, dict):
+            queries = {self._default_name(url): url for url in queries}
+        self.queries = queries
+        self.personal_access_token = personal_access_token
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.analyzer_kwargs = analyzer_kwargs
+        self.instrumentation = analyzer_kwargs.pop('instrumentation', None) or Instrumentation()
+
+        self.caches = {}
+        self.analyzers = {}
+
+    @staticmethod
+    def _default_name(query_url: str) -> str:
+        _, project, query_id = parse_query_url(query_url)
+        return f"{project}-{query_id}" if query_id else project
+
+    def _analyzer(self, organization: str, project: str) -> AzureDevOpsHistoryAnalyzer:
+        """The analyzer of a project, sharing its organization's cache and store"""
+        key = (organization, project)
+        if key not in self.analyzers:
+            if organization not in self.caches:
+                store = None
+                if self.cache_dir is not None:
+                    store = HistoryStore(os.path.join(self.cache_dir, organization))
+                self.caches[organization] = (WorkItemCache(max_items=self.cache_size), store)
+            cache, store = self.caches[organization]
+            self.analyzers[key] = AzureDevOpsHistoryAnalyzer(
+                organization, project, self.personal_access_token, None,
+                cache=cache, history_store=store, instrumentation=self.instrumentation, **self.analyzer_kwargs
+            )
+        return self.analyzers[key]
+
+    def resolve(self) -> Dict[str, Tuple[str, AzureDevOpsHistoryAnalyzer, List[int]]]:
+        """
+        Run every query
+
+        Returns:
+            Dictionary of team name to (organization, analyzer, work item IDs)
+        """
+        resolved = {}
+        with self.instrumentation.phase('resolve_queries'):
+            for name, query_url in self.queries.items():
+                organization, project, query_id = parse_query_url(query_url)
+                analyzer = self._analyzer(organization, project)
+                if query_id is not None:
+                    task_ids = analyzer.get_task_ids(query_id) or []
+                else:
+                    # Project URLs name no saved query, so every work item of the project is listed
+                    task_ids = list(analyzer.iter_task_ids(analyzer.build_wiql()))
+                print(f"{name}: {len(task_ids)} work items")
+                resolved[name] = (organization, analyzer, task_ids)
+        return resolved
+
+    def run(self, max_workers: int = 8, charts: bool = True) -> Dict[str, Dict]:
+        """
+        Resolve all queries, fetch each unique work item once and build every team's report
+
+        Args:
+            max_workers: Maximum number of concurrent requests when fetching
+            charts: Write a stacked state chart per team to output_dir
+
+        Returns:
+            Dictionary of team name to a dictionary with tasks (Task objects), metrics
+            (FlowAnalytics.summary) and chart (path of the saved chart, or None)
+        """
+        resolved = self.resolve()
+
+        # Each unique item is fetched through the first analyzer whose query returned it
+        owners = {}
+        for organization, analyzer, task_ids in resolved.values():
+            for task_id in task_ids:
+                owners.setdefault((organization, task_id), analyzer)
+
+        total = sum(len(task_ids) for _, _, task_ids in resolved.values())
+        print(f"Fetching {len(owners)} unique work items for {total} query results")
+
+        by_analyzer = {}
+        for (_, task_id), analyzer in owners.items():
+            by_analyzer.setdefault(analyzer, []).append(task_id)
+        fetched = {}
+        with self.instrumentation.phase('prefetch'):
+            for analyzer, task_ids in by_analyzer.items():
+                fetched[analyzer] = analyzer.prefetch(task_ids, max_workers=max_workers)
+
+        # One Task per unique item, so its metrics are computed once for every team it belongs to.
+        # Items that failed to load stay lazy and are fetched again on first use
+        tasks = {}
+        for key, analyzer in owners.items():
+            details, timelines = fetched[analyzer]
+            if key[1] in details and key[1] in timelines:
+                tasks[key] = Task.from_data(key[1], analyzer, details[key[1]], timelines[key[1]])
+            else:
+                tasks[key] = Task(key[1], analyzer)
+
+        if charts:
+            os.makedirs(self.output_dir, exist_ok=True)
+        visualizer = TaskGraphVisualizer(headless=True, instrumentation=self.instrumentation)
+
+        reports = {}
+        for name, (organization, _, task_ids) in resolved.items():
+            team_tasks = [tasks[(organization, task_id)] for task_id in task_ids]
+            chart_path = None
+            if charts and team_tasks:
+                chart_path = os.path.join(self.output_dir, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.png")
+                fig = visualizer.create_stacked_state_comparison_by_task(team_tasks, save_path=chart_path,
+                                                                         show_plot=False)
+                visualizer.release_figure(fig)
+
+            reports[name] = {
+                'tasks': team_tasks,
+                'metrics': FlowAnalytics(team_tasks).summary(),
+                'chart': chart_path
+            }
+        return reports
@@ -0,0 +1,170 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+from FlowAnalytics import FlowAnalytics
+
+
+class DeliveryForecaster:
+    """Monte Carlo delivery forecasts from a team's historical weekly throughput and cycle times
+
+    Every trial replays the future as a sequence of weeks whose completions are drawn from past
+    weeks (weeks without completions included). Trials are simulated together as NumPy arrays,
+    a block of weeks at a time, so 10,000 trials over years of weeks take milliseconds.
+    """
+
+    # Weeks simulated per block; trials still running after a block continue in the next one
+    WEEK_BLOCK = 52
+    # Give up on trials that have not finished after this many weeks
+    MAX_WEEKS = 520
+
+    def __init__(self, tasks: Optional[Sequence] = None, analytics: Optional[FlowAnalytics] = None,
+                 history_weeks: Optional[int] = None, trials: int = 10000, seed: Optional[int] = None,
+                 history_end: Optional[datetime] = None):
+        """
+        Initialize the forecaster
+
+        Args:
+            tasks: Task objects with history, e.g. from get_all_tasks
+            analytics: FlowAnalytics over the tasks (instead of tasks)
+            history_weeks: Only sample the most recent weeks of throughput (defaults to all)
+            trials: Number of simulated futures
+            seed: Random seed, for reproducible forecasts
+            history_end: End of the period the tasks cover; weeks between the last completion and
+                         this date count as weeks without completions. Pass the current time for
+                         queries that reach the present (defaults to ending at the last completion)
+        """
+        if analytics is None:
+            analytics = FlowAnalytics(tasks)
+        self.analytics = analytics
+        self.trials = trials
+        self.rng = np.random.default_rng(seed)
+
+        week_starts, throughput = analytics.weekly_throughput()
+        # Weeks after the last completion that the tasks still cover produced nothing and belong in the history too
+        if len(week_starts) and history_end is not None:
+            end_day = np.datetime64(history_end.astimezone(timezone.utc).replace(tzinfo=None)
+                                    if history_end.tzinfo else history_end, 'D')
+            idle_weeks = max(0, int((end_day - week_starts[-1].astype('datetime64[D]')).astype(np.int64)) // 7 - 1)
+            throughput = np.concatenate([throughput, np.zeros(idle_weeks, dtype=throughput.dtype)])
+        if history_weeks is not None:
+            throughput = throughput[-history_weeks:]
+        self.throughput = throughput
+
+        cycle_times = analytics.table.cycle_times()
+        self.cycle_times = np.sort(cycle_times[~np.isnan(cycle_times)])
+
+    def _check_history(self):
+        if not len(self.throughput) or not self.throughput.any():
+            raise ValueError("No completed work items in the throughput history to forecast from")
+
+    def _sample_weeks(self, trials: int, weeks: int) -> np.ndarray:
+        """Completions of each simulated week, as a (trials x weeks) matrix"""
+        return self.rng.choice(self.throughput, size=(trials, weeks))
+
+    @staticmethod
+    def _percentiles(values: np.ndarray, q: Sequence[float]) -> Dict[float, float]:
+        return {p: float(np.percentile(values, p)) for p in q}
+
+    def when_done(self, item_count: int, q: Sequence[float] = (50, 85, 95),
+                  start: Optional[datetime] = None) -> Dict:
+        """
+        Forecast when a number of items will be done
+
+        Args:
+            item_count: Number of items still to deliver
+            q: Confidence levels in percent; a q% date is met or beaten in q% of the trials
+            start: Date work starts from (defaults to today)
+
+        Returns:
+            Dictionary containing:
+            - items: item_count
+            - start: start date as datetime64[D]
+            - weeks: weeks needed at each confidence level
+            - dates: completion date (datetime64[D]) at each confidence level
+            - distribution: weeks needed in every trial (MAX_WEEKS + 1 for trials that never finish)
+        """
+        self._check_history()
+        if start is None:
+            start = datetime.now(timezone.utc)
+        start = np.datetime64(start.replace(tzinfo=None), 'D')
+
+        weeks_needed = np.full(self.trials, self.MAX_WEEKS + 1, dtype=np.int64)
+        running = np.arange(self.trials)
+        done = np.zeros(self.trials, dtype=np.int64)
+        weeks_simulated = 0
+
+        while len(running) and weeks_simulated < self.MAX_WEEKS and item_count > 0:
+            totals = done[:, None] + np.cumsum(self._sample_weeks(len(running), self.WEEK_BLOCK), axis=1)
+            finished = totals[:, -1] >= item_count
+            # First week in the block where the running total reaches the target
+            weeks_needed[running[finished]] = weeks_simulated + 1 + np.argmax(totals[finished] >= item_count, axis=1)
+            running = running[~finished]
+            done = totals[~finished, -1]
+            weeks_simulated += self.WEEK_BLOCK
+        if item_count <= 0:
+            weeks_needed[:] = 0
+
+        weeks = self._percentiles(weeks_needed, q)
+        return {
+            'items': item_count,
+            'start': start,
+            'weeks': weeks,
+            'dates': {p: start + np.timedelta64(int(np.ceil(w * 7)), 'D') for p, w in weeks.items()},
+            'distribution': weeks_needed
+        }
+
+    def how_many(self, weeks: Optional[int] = None, until: Optional[datetime] = None,
+                 q: Sequence[float] = (50, 85, 95)) -> Dict:
+        """
+        Forecast how many items will be done within a number of weeks or by a date
+
+        Args:
+            weeks: Number of weeks from now
+            until: Target date (instead of weeks), counted in whole weeks from today
+            q: Confidence levels in percent; at least the q% count is delivered in q% of the trials
+
+        Returns:
+            Dictionary containing:
+            - weeks: the forecast horizon in weeks
+            - items: items done at each confidence level
+            - distribution: items done in every trial
+        """
+        self._check_history()
+        if weeks is None:
+            if until is None:
+                raise ValueError("Pass either weeks or until")
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            weeks = max(0, (until.replace(tzinfo=None) - now).days // 7)
+
+        items_done = np.zeros(self.trials, dtype=np.int64)
+        for block_start in range(0, weeks, self.WEEK_BLOCK):
+            block = min(self.WEEK_BLOCK, weeks - block_start)
+            items_done += self._sample_weeks(self.trials, block).sum(axis=1)
+
+        return {
+            'weeks': weeks,
+            # Higher confidence means a smaller number that is still reached
+            'items': {p: int(np.floor(np.percentile(items_done, 100 - p))) for p in q},
+            'distribution': items_done
+        }
+
+    def item_completion(self, age_days: float, q: Sequence[float] = (50, 85, 95)) -> Dict[float, float]:
+        """
+        Forecast the remaining days of one item already in progress from historical cycle times
+
+        Only past items that took longer than the item's current age are sampled.
+
+        Args:
+            age_days: Days the item has been in progress
+            q: Confidence levels in percent
+
+        Returns:
+            Dictionary mapping each confidence level to the remaining days, or an empty
+            dictionary if no past item ran that long
+        """
+        longer = self.cycle_times[np.searchsorted(self.cycle_times, age_days, side='right'):]
+        if not len(longer):
+            return {}
+        remaining = self.rng.choice(longer, size=self.trials) - age_days
+        return self._percentiles(remaining, q)
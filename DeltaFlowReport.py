@@ -0,0 +1,147 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from StateTimeline import StateTimeline
+from Task import Task
+
+
+class DeltaFlowReport:
+    """Incremental flow report that only refreshes work items changed since the previous run
+
+    The details and state timeline of every task are kept in a JSON snapshot. On the next run
+    the query's IDs are listed (one request), items changed since the last sync are found with a
+    System.ChangedDate query, and only those plus newly added items are fetched again. Metrics are
+    derived from the timelines, so time in the current state keeps growing for unchanged open items.
+    """
+
+    # Changes are looked up from a little before the last sync to absorb clock skew
+    SYNC_OVERLAP = timedelta(minutes=5)
+
+    def __init__(self, analyzer, state_path: str):
+        """
+        Initialize the report
+
+        Args:
+            analyzer: AzureDevOpsHistoryAnalyzer used for fetching
+            state_path: Path of the JSON snapshot kept between runs
+        """
+        self.analyzer = analyzer
+        self.state_path = state_path
+        self.last_sync = None
+        self.snapshot = {}
+        self.changed_ids = []
+        self.load()
+
+    def load(self):
+        """Load the snapshot of the previous run, if there is one for the same query"""
+        if not os.path.exists(self.state_path):
+            return
+
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable report state {self.state_path}: {e}")
+            return
+
+        if state.get('query_id') != self.analyzer.tasks_id_query_id:
+            return
+
+        self.last_sync = state.get('last_sync')
+        self.snapshot = {int(task_id): entry for task_id, entry in state.get('tasks', {}).items()}
+
+    def save(self):
+        """Write the snapshot for the next run"""
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        state = {
+            'query_id': self.analyzer.tasks_id_query_id,
+            'last_sync': self.last_sync,
+            'tasks': {str(task_id): entry for task_id, entry in self.snapshot.items()}
+        }
+        temporary_path = f"{self.state_path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        # Replace atomically so an interrupted run never leaves a truncated snapshot
+        os.replace(temporary_path, self.state_path)
+
+    def _changed_since(self, since: str) -> Optional[List[int]]:
+        """IDs matching the saved query that changed after the given ISO timestamp"""
+        wiql = self.analyzer.get_query_wiql()
+        if wiql is None:
+            return None
+
+        wiql = self.analyzer.add_wiql_condition(wiql, f"[System.ChangedDate] > {self.analyzer._wiql_literal(since)}")
+        return self.analyzer.run_wiql(wiql, time_precision=True)
+
+    def _snapshot_task(self, task_id: int, entry: Dict) -> Task:
+        """A loaded Task from a snapshot entry"""
+        return Task.from_data(task_id, self.analyzer, entry['details'], StateTimeline.from_dict(entry['timeline']))
+
+    def run(self, full: bool = False, max_workers: int = 8) -> List[Task]:
+        """
+        Bring the report up to date and return its tasks
+
+        Args:
+            full: Ignore the previous snapshot and refetch every item
+            max_workers: Maximum number of concurrent requests when fetching changed items
+
+        Returns:
+            List of Task objects in query order, with details and timelines loaded (items that
+            failed to load and were not in the previous snapshot stay lazy). If the query itself
+            fails, the tasks of the previous snapshot are returned and nothing is saved
+        """
+        sync_start = datetime.now(timezone.utc)
+        task_ids = self.analyzer.get_task_ids()
+        if task_ids is None:
+            # An empty result would drop every item; keep the snapshot and sync time for the next run
+            print("Query failed, reporting the previous snapshot unchanged")
+            return [self._snapshot_task(task_id, entry) for task_id, entry in self.snapshot.items()]
+
+        changed = None
+        if not full and self.last_sync and self.snapshot:
+            since = datetime.fromisoformat(self.last_sync) - self.SYNC_OVERLAP
+            changed = self._changed_since(since.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            if changed is None:
+                print("Changed-since query failed, refreshing every item")
+
+        if changed is None:
+            stale = set(task_ids)
+        else:
+            # Items new to the query may have changed before the last sync, so they are fetched too
+            stale = set(changed) | {task_id for task_id in task_ids if task_id not in self.snapshot}
+        self.changed_ids = [task_id for task_id in task_ids if task_id in stale]
+
+        print(f"Refreshing {len(self.changed_ids)} of {len(task_ids)} work items")
+        for task_id in self.changed_ids:
+            self.analyzer.invalidate(task_id)
+        details, timelines = self.analyzer.prefetch(self.changed_ids, max_workers=max_workers)
+
+        snapshot = {}
+        tasks = []
+        for task_id in task_ids:
+            if task_id not in stale:
+                entry = self.snapshot[task_id]
+                snapshot[task_id] = entry
+                tasks.append(self._snapshot_task(task_id, entry))
+            elif task_id in details and task_id in timelines:
+                snapshot[task_id] = {'details': details[task_id], 'timeline': timelines[task_id].to_dict()}
+                tasks.append(Task.from_data(task_id, self.analyzer, details[task_id], timelines[task_id]))
+            else:
+                # Items that failed to load are left out of the snapshot, so the next run fetches
+                # them again as new; this run reports their previous data if there is any
+                entry = self.snapshot.get(task_id)
+                if entry is not None:
+                    tasks.append(self._snapshot_task(task_id, entry))
+                else:
+                    tasks.append(Task(task_id, self.analyzer))
+
+        # Items that left the query are dropped from the snapshot
+        self.snapshot = snapshot
+        self.last_sync = sync_start.isoformat()
+        self.save()
+        return tasks
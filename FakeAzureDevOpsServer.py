@@ -0,0 +1,371 @@
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class FakeAzureDevOpsServer:
+    """Local stand-in for the Azure DevOps REST endpoints the analyzer uses, serving synthetic work items
+
+    Serves saved-query and ad-hoc WIQL, workitemsbatch, single work item, /updates and reporting
+    revisions requests for one organization and project, with configurable latency and per-endpoint request counts.
+    """
+
+    STATES = ['New', 'Active', 'Code Review', 'Resolved', 'Closed']
+    WIQL_MAX_RESULTS = 20000
+
+    def __init__(self, item_count: int = 500, transitions_per_item: int = 8, latency: float = 0.0,
+                 organization: str = 'bench', project: str = 'Bench', query_id: str = '00000000-0000-0000-0000-000000000000',
+                 seed: int = 0, filler_bytes: int = 512):
+        """
+        Generate the synthetic data set
+
+        Args:
+            item_count: Number of work items
+            transitions_per_item: Average number of state transitions per work item
+            latency: Seconds each response is delayed by
+            organization: Organization name served
+            project: Project name served
+            query_id: ID of the saved query returning all work items
+            seed: Random seed for the synthetic histories
+            filler_bytes: Size of the description text added to every update, as real updates carry
+        """
+        self.organization = organization
+        self.project = project
+        self.query_id = query_id
+        # Saved queries by ID; None selects every work item
+        self.queries = {query_id: None}
+        self.latency = latency
+        self.filler_bytes = filler_bytes
+        self.request_counts = Counter()
+        self._lock = threading.Lock()
+
+        rng = random.Random(seed)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.items = {}
+        for work_item_id in range(1, item_count + 1):
+            created = start + timedelta(hours=rng.uniform(0, 24 * 300))
+            self.items[work_item_id] = self._generate_history(work_item_id, created, transitions_per_item, rng)
+
+        self._server = None
+        self._thread = None
+
+    def _generate_history(self, work_item_id: int, created: datetime, transitions: int, rng: random.Random) -> Dict:
+        """Random walk through the workflow states, with rework loops back to Active"""
+        updates = []
+        timestamp = created
+        state = 'New'
+        count = max(1, int(rng.gauss(transitions, transitions / 4)))
+
+        for rev in range(1, count + 1):
+            fields = {
+                'System.Rev': {'oldValue': rev - 1, 'newValue': rev} if rev > 1 else {'newValue': rev},
+                'System.ChangedDate': {'newValue': self._format(timestamp)},
+                'System.Description': {'newValue': 'x' * self.filler_bytes}
+            }
+            if rev == 1:
+                fields['System.State'] = {'newValue': state}
+            else:
+                new_state = self._next_state(state, rng)
+                fields['System.State'] = {'oldValue': state, 'newValue': new_state}
+                state = new_state
+
+            updates.append({
+                'id': rev,
+                'workItemId': work_item_id,
+                'rev': rev,
+                'revisedBy': {'displayName': 'Bench User'},
+                'revisedDate': None,
+                'fields': fields
+            })
+            timestamp += timedelta(hours=rng.expovariate(1 / 36))
+            if state == 'Closed':
+                break
+
+        # revisedDate is when the revision was superseded; the latest one never was
+        for update, following in zip(updates, updates[1:]):
+            update['revisedDate'] = following['fields']['System.ChangedDate']['newValue']
+        updates[-1]['revisedDate'] = '9999-01-01T00:00:00Z'
+
+        return {
+            'fields': {
+                'System.Id': work_item_id,
+                'System.Title': f'Synthetic work item {work_item_id}',
+                'System.WorkItemType': 'Task',
+                'System.State': state,
+                'System.CreatedDate': self._format(created),
+                'System.ChangedDate': updates[-1]['fields']['System.ChangedDate']['newValue'],
+                'System.Rev': updates[-1]['rev']
+            },
+            'updates': updates
+        }
+
+    def _next_state(self, state: str, rng: random.Random) -> str:
+        if state == 'New':
+            return 'Active'
+        if state == 'Active':
+            return 'Code Review' if rng.random() < 0.7 else 'Resolved'
+        if state == 'Code Review':
+            return 'Active' if rng.random() < 0.3 else 'Resolved'
+        if state == 'Resolved':
+            return 'Active' if rng.random() < 0.2 else 'Closed'
+        return 'Closed'
+
+    def touch(self, work_item_id: int, state: Optional[str] = None):
+        """
+        Simulate an edit of a work item by appending a revision dated now
+
+        Args:
+            work_item_id: The ID of the work item
+            state: Optional new state the revision moves the item to
+        """
+        with self._lock:
+            item = self.items[work_item_id]
+            rev = item['fields']['System.Rev'] + 1
+            now = self._format(datetime.now(timezone.utc))
+            fields = {
+                'System.Rev': {'oldValue': rev - 1, 'newValue': rev},
+                'System.ChangedDate': {'oldValue': item['fields']['System.ChangedDate'], 'newValue': now}
+            }
+            if state is not None and state != item['fields']['System.State']:
+                fields['System.State'] = {'oldValue': item['fields']['System.State'], 'newValue': state}
+                item['fields']['System.State'] = state
+
+            item['updates'][-1]['revisedDate'] = now
+            item['updates'].append({
+                'id': rev,
+                'workItemId': work_item_id,
+                'rev': rev,
+                'revisedBy': {'displayName': 'Bench User'},
+                'revisedDate': '9999-01-01T00:00:00Z',
+                'fields': fields
+            })
+            item['fields']['System.Rev'] = rev
+            item['fields']['System.ChangedDate'] = now
+
+    def add_query(self, query_id: str, work_item_ids: List[int]):
+        """
+        Add a saved query returning the given work items
+
+        Args:
+            query_id: ID of the saved query
+            work_item_ids: IDs the query returns
+        """
+        self.queries[query_id] = list(work_item_ids)
+
+    @staticmethod
+    def _format(timestamp: datetime) -> str:
+        return timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    @property
+    def host(self) -> str:
+        """Base URL to pass to the analyzer as host"""
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.request_counts.values())
+
+    def reset_counts(self):
+        """Reset the per-endpoint request counters"""
+        with self._lock:
+            self.request_counts.clear()
+
+    def start(self) -> 'FakeAzureDevOpsServer':
+        """Start serving on a free local port in a background thread"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, keep-alive requests stall ~40 ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                fake._handle(self, 'GET')
+
+            def do_POST(self):
+                fake._handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FakeAzureDevOpsServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.request_counts[endpoint] += 1
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        parsed = urllib.parse.urlparse(handler.path)
+        path = urllib.parse.unquote(parsed.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        body = None
+        length = int(handler.headers.get('Content-Length') or 0)
+        if length:
+            body = json.loads(handler.rfile.read(length))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        prefix = f"/{self.organization}/{self.project}/_apis/wit/"
+        if not path.startswith(prefix):
+            return self._send(handler, 404, {'message': f'Unknown path {path}'})
+        route = path[len(prefix):]
+
+        status, payload = self._route(method, route, query, body)
+        self._send(handler, status, payload)
+
+    def _route(self, method: str, route: str, query: Dict, body: Optional[Dict]):
+        if method == 'GET' and route.startswith('wiql/') and route[5:] in self.queries:
+            self._count('wiql')
+            ids = self.queries[route[5:]]
+            if ids is None:
+                ids = sorted(self.items)
+            if len(ids) > self.WIQL_MAX_RESULTS:
+                return 400, {'message': 'VS402337: The number of work items returned exceeds the size limit of 20000.'}
+            return 200, self._wiql_result(ids)
+
+        if method == 'GET' and route.startswith('queries/') and route[8:] in self.queries:
+            self._count('queries')
+            return 200, {'id': route[8:], 'wiql': 'SELECT [System.Id] FROM WorkItems WHERE [System.TeamProject] = @project'}
+
+        if method == 'POST' and route == 'wiql':
+            self._count('wiql')
+            return self._run_wiql(body.get('query', ''), query)
+
+        if method == 'POST' and route == 'workitemsbatch':
+            self._count('workitemsbatch')
+            fields = body.get('fields')
+            values = []
+            for work_item_id in body.get('ids', []):
+                item = self.items.get(work_item_id)
+                values.append(self._work_item(work_item_id, item, fields) if item else None)
+            return 200, {'count': len(values), 'value': values}
+
+        if method == 'GET' and route == 'reporting/workitemrevisions':
+            self._count('reporting')
+            return 200, self._reporting_revisions(query)
+
+        match = re.fullmatch(r'workItems/(\d+)(/updates)?', route)
+        if method == 'GET' and match:
+            work_item_id = int(match.group(1))
+            item = self.items.get(work_item_id)
+            if item is None:
+                return 404, {'message': f'Work item {work_item_id} does not exist.'}
+
+            if match.group(2):
+                self._count('updates')
+                skip = int(query.get('$skip', 0))
+                top = int(query.get('$top', 200))
+                value = item['updates'][skip:skip + top]
+                return 200, {'count': len(value), 'value': value}
+
+            self._count('workItems')
+            return 200, self._work_item(work_item_id, item)
+
+        return 404, {'message': f'Unsupported request {method} {route}'}
+
+    def _work_item(self, work_item_id: int, item: Dict, fields: Optional[List[str]] = None) -> Dict:
+        values = item['fields']
+        if fields:
+            values = {name: values[name] for name in fields if name in values}
+        return {'id': work_item_id, 'rev': item['fields']['System.Rev'], 'fields': values}
+
+    def _reporting_revisions(self, query: Dict) -> Dict:
+        """One page of the reporting revisions feed; the continuation token is an offset into the feed"""
+        fields = query.get('fields', 'System.State,System.ChangedDate').split(',')
+        with self._lock:
+            revisions = []
+            for work_item_id, item in self.items.items():
+                values = {}
+                for update in item['updates']:
+                    for name, change in update['fields'].items():
+                        values[name] = change.get('newValue')
+                    revisions.append({
+                        'id': work_item_id,
+                        'rev': update['rev'],
+                        'fields': {name: values[name] for name in fields if name in values}
+                    })
+
+        # Revisions are ordered by change time, so revisions made later are always appended
+        revisions.sort(key=lambda revision: (revision['fields'].get('System.ChangedDate', ''),
+                                             revision['id'], revision['rev']))
+        start = int(query.get('continuationToken', 0))
+        end = start + int(query.get('$maxPageSize', 200))
+        return {
+            'values': revisions[start:end],
+            'continuationToken': str(min(end, len(revisions))),
+            'isLastBatch': end >= len(revisions)
+        }
+
+    def _wiql_result(self, ids: List[int]) -> Dict:
+        return {
+            'queryType': 'flat',
+            'workItems': [{'id': work_item_id, 'url': ''} for work_item_id in ids]
+        }
+
+    def _run_wiql(self, wiql: str, query: Dict):
+        """Evaluate the subset of WIQL the analyzer generates: ID, ChangedDate, State and type filters and $top"""
+        ids = sorted(self.items)
+
+        lower = re.search(r"\[System\.Id\]\s*>\s*(\d+)", wiql)
+        if lower:
+            ids = [work_item_id for work_item_id in ids if work_item_id > int(lower.group(1))]
+
+        for operator, value in re.findall(r"\[System\.ChangedDate\]\s*(>=|>|<)\s*'([^']+)'", wiql):
+            bound = datetime.fromisoformat(value)
+            if bound.tzinfo is None:
+                bound = bound.replace(tzinfo=timezone.utc)
+            ids = [work_item_id for work_item_id in ids
+                   if self._compare(datetime.fromisoformat(self.items[work_item_id]['fields']['System.ChangedDate']),
+                                    operator, bound)]
+
+        for field in ('System.State', 'System.WorkItemType'):
+            values = re.search(rf"\[{re.escape(field)}\]\s+IN\s*\(([^)]*)\)", wiql, re.IGNORECASE)
+            if values:
+                allowed = set(re.findall(r"'([^']*)'", values.group(1)))
+                ids = [work_item_id for work_item_id in ids if self.items[work_item_id]['fields'][field] in allowed]
+
+        top = int(query.get('$top', self.WIQL_MAX_RESULTS + 1))
+        if len(ids) > self.WIQL_MAX_RESULTS and top > self.WIQL_MAX_RESULTS:
+            return 400, {'message': 'VS402337: The number of work items returned exceeds the size limit of 20000.'}
+        return 200, self._wiql_result(ids[:top])
+
+    @staticmethod
+    def _compare(value: datetime, operator: str, bound: datetime) -> bool:
+        if operator == '>=':
+            return value >= bound
+        if operator == '>':
+            return value > bound
+        return value < bound
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, payload: Dict):
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json; charset=utf-8')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
@@ -0,0 +1,168 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from TransitionTable import TransitionTable
+
+
+class FlowAnalytics:
+    """Team-level flow metrics over a set of tasks: percentiles, throughput, WIP over time and rework
+
+    Everything is computed with vectorized operations over a TransitionTable; WIP per state is
+    built from one sorted sweep over all enter/leave events rather than rescanning tasks per day.
+    """
+
+    # Bucket sizes in seconds for time series
+    RESOLUTIONS = {
+        'H': 3600,
+        'D': 86400,
+        'W': 7 * 86400
+    }
+    # 1970-01-01 was a Thursday; weeks are aligned to Mondays
+    MONDAY_OFFSET = 4 * 86400
+
+    def __init__(self, tasks: Optional[Sequence] = None, table: Optional[TransitionTable] = None):
+        """
+        Initialize the analytics
+
+        Args:
+            tasks: Task objects, e.g. from get_all_tasks
+            table: Prebuilt TransitionTable (instead of tasks)
+        """
+        if table is None:
+            table = TransitionTable.from_tasks(tasks or [])
+        self.table = table
+
+    def cycle_time_percentiles(self, q: Sequence[float] = (50, 85, 95)) -> Dict[float, float]:
+        """Get cycle time percentiles in days over closed tasks"""
+        return self.table.percentiles(self.table.cycle_times(), q)
+
+    def lead_time_percentiles(self, q: Sequence[float] = (50, 85, 95)) -> Dict[float, float]:
+        """Get lead time percentiles in days over closed tasks"""
+        return self.table.percentiles(self.table.lead_times(), q)
+
+    def completion_times(self) -> np.ndarray:
+        """Get the epoch seconds each task was last closed (NaN for tasks never closed)"""
+        return self.table.last_entry('Closed')
+
+    def weekly_throughput(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count tasks completed per week (Monday to Sunday, UTC)
+
+        Returns:
+            Tuple of (week_starts, counts): week start dates as datetime64 and completions per week,
+            including weeks without completions between the first and last one
+        """
+        completed = self.completion_times()
+        completed = completed[~np.isnan(completed)]
+        if not len(completed):
+            return np.array([], dtype='datetime64[s]'), np.array([], dtype=np.int64)
+
+        week = self.RESOLUTIONS['W']
+        weeks = np.floor((completed - self.MONDAY_OFFSET) / week).astype(np.int64)
+        first_week = weeks.min()
+        counts = np.bincount(weeks - first_week)
+        week_starts = (first_week + np.arange(len(counts))) * week + self.MONDAY_OFFSET
+        return week_starts.astype('datetime64[s]'), counts
+
+    def _state_events(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Enter and leave events of every state, sorted by time
+
+        Returns:
+            Tuple of (times, state codes, deltas) with +1 for entering and -1 for leaving a state
+        """
+        table = self.table
+        if not len(table.timestamps):
+            return np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        # Each transition after a task's first one leaves the state the task was in before
+        follows = np.zeros(len(table.task_index), dtype=bool)
+        follows[1:] = table.task_index[1:] == table.task_index[:-1]
+        leave_index = np.nonzero(follows)[0]
+
+        times = np.concatenate([table.timestamps, table.timestamps[leave_index]])
+        codes = np.concatenate([table.state_code, table.state_code[leave_index - 1]])
+        deltas = np.concatenate([np.ones(len(table.timestamps), dtype=np.int64),
+                                 -np.ones(len(leave_index), dtype=np.int64)])
+
+        order = np.argsort(times, kind='stable')
+        return times[order], codes[order], deltas[order]
+
+    def wip_over_time(self, resolution: str = 'D', start: Optional[float] = None,
+                      end: Optional[float] = None) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """
+        Number of tasks in each state over time (cumulative flow)
+
+        Args:
+            resolution: 'H' (hourly), 'D' (daily) or 'W' (weekly) sampling
+            start: Epoch seconds of the first sample (defaults to the first transition)
+            end: Epoch seconds of the last sample (defaults to now)
+
+        Returns:
+            Tuple of (sample_times, state_names, counts) where sample_times are datetime64 values
+            and counts is a (samples x states) matrix of tasks in each state at each sample time
+        """
+        step = self.RESOLUTIONS[resolution]
+        times, codes, deltas = self._state_events()
+        states = list(self.table.state_names)
+        if not len(times):
+            return np.array([], dtype='datetime64[s]'), states, np.zeros((0, len(states)), dtype=np.int64)
+
+        if start is None:
+            start = times[0]
+        if end is None:
+            end = self.table.now
+        first_sample = np.floor(start / step) * step
+        samples = np.arange(first_sample, end + step, step)
+
+        counts = np.zeros((len(samples), len(states)), dtype=np.int64)
+        for code in range(len(states)):
+            mask = codes == code
+            running = np.cumsum(deltas[mask])
+            # Number of this state's events at or before each sample time
+            positions = np.searchsorted(times[mask], samples, side='right')
+            counts[:, code] = np.where(positions > 0, running[np.maximum(positions - 1, 0)], 0)
+
+        return samples.astype(np.int64).astype('datetime64[s]'), states, counts
+
+    def rework_rate(self) -> Dict:
+        """
+        Share of resolved tasks that had to be resolved more than once
+
+        Returns:
+            Dictionary containing:
+            - resolved_tasks: tasks resolved at least once
+            - reworked_tasks: tasks resolved more than once
+            - rework_rate: reworked_tasks / resolved_tasks (NaN if nothing was resolved)
+            - extra_resolutions: total resolutions beyond the first, across all tasks
+        """
+        resolved_counts = self.table.resolved_counts()
+        resolved = int(np.count_nonzero(resolved_counts >= 1))
+        reworked = int(np.count_nonzero(resolved_counts > 1))
+        return {
+            'resolved_tasks': resolved,
+            'reworked_tasks': reworked,
+            'rework_rate': reworked / resolved if resolved else float('nan'),
+            'extra_resolutions': int(np.maximum(resolved_counts - 1, 0).sum())
+        }
+
+    def summary(self, q: Sequence[float] = (50, 85, 95)) -> Dict:
+        """
+        All aggregate metrics in one dictionary
+
+        Args:
+            q: Percentiles to compute
+
+        Returns:
+            Dictionary with cycle_time and lead_time percentiles, weekly_throughput
+            (mean completions per week), and the rework figures of rework_rate
+        """
+        _, throughput = self.weekly_throughput()
+        summary = {
+            'tasks': self.table.task_count,
+            'cycle_time': self.cycle_time_percentiles(q),
+            'lead_time': self.lead_time_percentiles(q),
+            'weekly_throughput': float(throughput.mean()) if len(throughput) else 0.0
+        }
+        summary.update(self.rework_rate())
+        return summary
@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class HistoryStore:
+    """Persistent SQLite store of work item updates, keyed by ID and last known revision
+
+    Details are not stored: the workitemsbatch request that tells whether an item changed returns
+    its details anyway.
+    """
+
+    def __init__(self, cache_dir: str, filename: str = 'history.sqlite3'):
+        """
+        Open (or create) the store
+
+        Args:
+            cache_dir: Directory holding the database file
+            filename: Name of the database file
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, filename)
+        # Prefetch workers share one connection, serialized by the lock
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS work_items ('
+                'id INTEGER PRIMARY KEY, '
+                'rev INTEGER, '
+                'updates TEXT)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS meta ('
+                'key TEXT PRIMARY KEY, '
+                'value TEXT)'
+            )
+
+    def get(self, work_item_id: int) -> Optional[Tuple[Optional[int], Optional[Dict]]]:
+        """
+        Get the stored revision and updates of a work item
+
+        Args:
+            work_item_id: The ID of the work item
+
+        Returns:
+            Tuple of (rev, updates), or None if the item was never stored
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT rev, updates FROM work_items WHERE id = ?', (work_item_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        rev, updates = row
+        return rev, json.loads(updates) if updates else None
+
+    def put_updates(self, work_item_id: int, rev: Optional[int], updates: Dict):
+        """Store updates of a work item together with the revision they cover"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT INTO work_items (id, rev, updates) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET rev = excluded.rev, updates = excluded.updates',
+                (work_item_id, rev, json.dumps(updates, separators=(',', ':')))
+            )
+
+    def put_updates_many(self, items: Iterable[Tuple[int, Optional[int], Dict]]):
+        """Store updates of many work items, as (id, rev, updates) tuples, in one transaction"""
+        rows = [(work_item_id, rev, json.dumps(updates, separators=(',', ':')))
+                for work_item_id, rev, updates in items]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO work_items (id, rev, updates) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET rev = excluded.rev, updates = excluded.updates',
+                rows
+            )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Get a stored sync setting, such as a continuation token, or None"""
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_meta(self, key: str, value: Optional[str]):
+        """Store a sync setting"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT INTO meta (key, value) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                (key, value)
+            )
+
+    def delete(self, work_item_id: int):
+        """Forget a work item"""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM work_items WHERE id = ?', (work_item_id,))
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,165 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+class Instrumentation:
+    """Collects request, cache and phase metrics for the analyzer and visualizer
+
+    Listeners registered with add_listener receive every event as it happens, e.g. to forward
+    them to an external metrics exporter:
+        - ('request', {'endpoint', 'seconds', 'bytes', 'status'})
+        - ('retry', {'endpoint', 'status'})
+        - ('cache', {'kind', 'hit'})
+        - ('phase', {'name', 'seconds'})
+    """
+
+    # Upper bounds in seconds of the request latency histogram buckets; the last bucket is unbounded
+    LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+    def __init__(self):
+        """Initialize empty metrics"""
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.reset()
+
+    def reset(self):
+        """Clear all collected metrics (listeners are kept)"""
+        with self._lock:
+            self.requests = defaultdict(int)
+            self.errors = defaultdict(int)
+            self.retries = defaultdict(int)
+            self.bytes = defaultdict(int)
+            self.latency_total = defaultdict(float)
+            self.latency_histogram = defaultdict(lambda: [0] * (len(self.LATENCY_BUCKETS) + 1))
+            self.cache_hits = defaultdict(int)
+            self.cache_misses = defaultdict(int)
+            self.phase_seconds = defaultdict(float)
+            self.phase_calls = defaultdict(int)
+
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        """
+        Register a callback invoked with (event, data) for every recorded event
+
+        Args:
+            callback: Function taking the event name and its data dictionary
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, Dict], None]):
+        """Unregister a callback added with add_listener"""
+        self._listeners.remove(callback)
+
+    def _emit(self, event: str, data: Dict):
+        for callback in self._listeners:
+            callback(event, data)
+
+    def record_request(self, endpoint: str, seconds: float, size: int, status: int):
+        """
+        Record one HTTP request
+
+        Args:
+            endpoint: Endpoint name, e.g. 'updates'
+            seconds: Time until the response arrived
+            size: Response body bytes received, before content decoding
+            status: HTTP status code (0 if the request failed without a response)
+        """
+        with self._lock:
+            self.requests[endpoint] += 1
+            if status == 0 or status >= 400:
+                self.errors[endpoint] += 1
+            self.bytes[endpoint] += size
+            self.latency_total[endpoint] += seconds
+            self.latency_histogram[endpoint][bisect.bisect_left(self.LATENCY_BUCKETS, seconds)] += 1
+        self._emit('request', {'endpoint': endpoint, 'seconds': seconds, 'bytes': size, 'status': status})
+
+    def record_retry(self, endpoint: str, status: int):
+        """Record that a request is retried after a throttled or failed attempt"""
+        with self._lock:
+            self.retries[endpoint] += 1
+        self._emit('retry', {'endpoint': endpoint, 'status': status})
+
+    def record_cache(self, kind: str, hit: bool):
+        """
+        Record a cache lookup
+
+        Args:
+            kind: What was looked up, e.g. 'updates', 'details', 'timeline' or 'history_store'
+            hit: Whether the value was found
+        """
+        with self._lock:
+            if hit:
+                self.cache_hits[kind] += 1
+            else:
+                self.cache_misses[kind] += 1
+        self._emit('cache', {'kind': kind, 'hit': hit})
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block of work under the given phase name; repeated phases accumulate"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.phase_seconds[name] += seconds
+                self.phase_calls[name] += 1
+            self._emit('phase', {'name': name, 'seconds': seconds})
+
+    def summary(self) -> Dict:
+        """
+        Get all collected metrics
+
+        Returns:
+            Dictionary containing:
+            - requests: per endpoint count, errors, retries, bytes, mean latency and latency histogram
+            - cache: per kind hits and misses
+            - phases: per phase total seconds and number of calls
+        """
+        with self._lock:
+            return {
+                'requests': {
+                    endpoint: {
+                        'count': count,
+                        'errors': self.errors[endpoint],
+                        'retries': self.retries[endpoint],
+                        'bytes': self.bytes[endpoint],
+                        'mean_latency': self.latency_total[endpoint] / count,
+                        'latency_histogram': dict(zip(
+                            [f'<={bound}s' for bound in self.LATENCY_BUCKETS] + [f'>{self.LATENCY_BUCKETS[-1]}s'],
+                            self.latency_histogram[endpoint]
+                        ))
+                    }
+                    for endpoint, count in self.requests.items()
+                },
+                'cache': {
+                    kind: {'hits': self.cache_hits[kind], 'misses': self.cache_misses[kind]}
+                    for kind in sorted(set(self.cache_hits) | set(self.cache_misses))
+                },
+                'phases': {
+                    name: {'seconds': seconds, 'calls': self.phase_calls[name]}
+                    for name, seconds in self.phase_seconds.items()
+                }
+            }
+
+    def print_summary(self):
+        """Print a readable summary of all collected metrics"""
+        summary = self.summary()
+
+        print("Requests:")
+        for endpoint, stats in sorted(summary['requests'].items()):
+            print(f"  {endpoint}: {stats['count']} requests, {stats['errors']} errors, {stats['retries']} retries, "
+                  f"{stats['bytes'] / 1024:.1f} KiB, mean {stats['mean_latency'] * 1000:.0f} ms")
+
+        print("Cache:")
+        for kind, stats in summary['cache'].items():
+            lookups = stats['hits'] + stats['misses']
+            print(f"  {kind}: {stats['hits']}/{lookups} hits")
+
+        print("Phases:")
+        for name, stats in summary['phases'].items():
+            print(f"  {name}: {stats['seconds']:.2f}s over {stats['calls']} calls")
@@ -0,0 +1,217 @@
+import requests
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from StateTimeline import StateTimeline
+
+
+class ReportingRevisionSync:
+    """History backend reading state changes of the whole project from the reporting revisions feed
+
+    Instead of one /updates request per work item, the reporting work item revisions endpoint
+    returns revisions of every item in pages, with only the System.State and System.ChangedDate
+    fields. The revisions are turned into lean updates payloads (the shape get_work_item_updates
+    returns with lean_updates) and put in the analyzer's cache and history store. The continuation
+    token of the last page is kept, so the next sync only reads revisions made since.
+    """
+
+    FIELDS = ['System.State', 'System.ChangedDate']
+    # Revisions per page of the reporting feed
+    PAGE_SIZE = 1000
+    # History store key of the continuation token, suffixed with the organization and project
+    # since one store may be shared by every project of an organization
+    TOKEN_KEY = 'reporting_revisions_token'
+
+    def __init__(self, analyzer):
+        """
+        Initialize the backend
+
+        Args:
+            analyzer: AzureDevOpsHistoryAnalyzer whose cache and history store are filled
+        """
+        self.analyzer = analyzer
+        self.token_key = f"{self.TOKEN_KEY}:{analyzer.organization}/{analyzer.project}"
+        self.continuation_token = None
+        if analyzer.history_store is not None:
+            self.continuation_token = analyzer.history_store.get_meta(self.token_key)
+
+    def _read_pages(self) -> Iterator[Dict[int, List[Dict]]]:
+        """
+        Read the revisions after the continuation token one page at a time
+
+        The continuation token is only advanced once the last page was read.
+
+        Yields:
+            Revisions of each page, grouped by work item in revision order
+
+        Raises:
+            requests.exceptions.RequestException: If a request failed
+        """
+        url = f"{self.analyzer.base_url}/wit/reporting/workitemrevisions"
+        token = self.continuation_token
+
+        while True:
+            params = {
+                'fields': ','.join(self.FIELDS),
+                'includeLatestOnly': 'false',
+                '$maxPageSize': self.PAGE_SIZE,
+                'api-version': '7.0'
+            }
+            if token:
+                params['continuationToken'] = token
+
+            response = self.analyzer._get(url, params=params)
+            response.raise_for_status()
+            page = response.json()
+
+            revisions = {}
+            for revision in page.get('values', []):
+                revisions.setdefault(revision['id'], []).append(revision)
+            for item_revisions in revisions.values():
+                item_revisions.sort(key=lambda revision: revision['rev'])
+            yield revisions
+
+            token = page.get('continuationToken', token)
+            if page.get('isLastBatch', True):
+                break
+
+        self.continuation_token = token
+
+    @staticmethod
+    def _last_state(updates: Dict) -> Optional[str]:
+        """The state an updates payload ends in"""
+        for update in reversed(updates.get('value', [])):
+            state = (update.get('fields') or {}).get('System.State')
+            if state:
+                return state.get('newValue')
+        return None
+
+    @staticmethod
+    def _last_rev(updates: Dict) -> int:
+        """The latest revision an updates payload covers"""
+        if updates.get('rev') is not None:
+            return updates['rev']
+        value = updates.get('value', [])
+        return value[-1].get('rev', len(value)) if value else 0
+
+    def _merge(self, base: Optional[Dict], revisions: List[Dict]) -> Dict:
+        """
+        Append the state changes among revisions to a lean updates payload
+
+        Args:
+            base: Payload holding the item's earlier history, or None to start a new one
+            revisions: Reporting revisions of the item, in revision order
+
+        Returns:
+            Updates payload with count, value, revisions and rev
+        """
+        value = list(base['value']) if base else []
+        state = self._last_state(base) if base else None
+        last_rev = self._last_rev(base) if base else 0
+
+        for revision in revisions:
+            if revision['rev'] <= last_rev:
+                continue
+            last_rev = revision['rev']
+            fields = revision.get('fields', {})
+            new_state = fields.get('System.State')
+            if not new_state or new_state == state:
+                continue
+
+            state_change = {'newValue': new_state}
+            if state is not None:
+                state_change['oldValue'] = state
+            value.append({
+                'rev': revision['rev'],
+                'revisedDate': None,
+                'fields': {
+                    'System.State': state_change,
+                    'System.ChangedDate': {'newValue': fields.get('System.ChangedDate')}
+                }
+            })
+            state = new_state
+
+        # Every revision is one update, so revision numbers double as the /updates $skip position
+        return {'count': len(value), 'value': value, 'revisions': last_rev, 'rev': last_rev}
+
+    def _stored_updates(self, work_item_id: int) -> Optional[Dict]:
+        """Earlier history of a work item from the analyzer's cache or history store"""
+        updates = self.analyzer.cache.get_updates(work_item_id)
+        if updates is None and self.analyzer.history_store is not None:
+            stored = self.analyzer.history_store.get(work_item_id)
+            if stored is not None:
+                updates = stored[1]
+        return updates
+
+    def sync(self, task_ids: Optional[Iterable[int]] = None) -> bool:
+        """
+        Bring the cached histories up to date from the reporting feed
+
+        The first sync reads the whole project history; later ones continue from the stored
+        continuation token. Each page is merged and stored as it arrives, so only the histories
+        of wanted items are held in memory. Items changed since the last sync whose earlier
+        history is not available any more lose their cached updates and timeline, so they are
+        fetched again through /updates.
+
+        Args:
+            task_ids: IDs to put in the in-memory cache (defaults to every item in the feed);
+                      the history store receives every item
+
+        Returns:
+            True if the sync completed, False if the feed could not be read
+        """
+        analyzer = self.analyzer
+        store = analyzer.history_store
+        incremental = self.continuation_token is not None
+        wanted = set(task_ids) if task_ids is not None else None
+        # Histories of wanted items, cached once the sync completes
+        merged = {}
+        # Unwanted items already written to the store by an earlier page of this sync
+        stored = set()
+        dropped = set()
+        revision_count = 0
+
+        try:
+            for page in self._read_pages():
+                rows = []
+                for work_item_id, item_revisions in page.items():
+                    revision_count += len(item_revisions)
+                    keep = wanted is None or work_item_id in wanted
+                    if work_item_id in dropped or (not keep and store is None):
+                        continue
+
+                    if work_item_id in merged:
+                        base = merged[work_item_id]
+                    elif incremental or work_item_id in stored:
+                        base = self._stored_updates(work_item_id)
+                    else:
+                        base = None
+                    if incremental and base is None:
+                        dropped.add(work_item_id)
+                        analyzer.cache.discard_updates(work_item_id)
+                        analyzer.cache.discard_timeline(work_item_id)
+                        continue
+
+                    updates = self._merge(base, item_revisions)
+                    if keep:
+                        merged[work_item_id] = updates
+                    else:
+                        stored.add(work_item_id)
+                    rows.append((work_item_id, updates['rev'], updates))
+
+                if store is not None:
+                    # One transaction per page instead of one per work item
+                    store.put_updates_many(rows)
+        except requests.exceptions.RequestException as e:
+            print(f"Error reading reporting revisions: {e}")
+            return False
+
+        for work_item_id, updates in merged.items():
+            analyzer.cache.put_updates(work_item_id, updates)
+            analyzer.cache.put_timeline(work_item_id, StateTimeline.from_updates(updates))
+            if not analyzer.keep_raw_updates:
+                analyzer.cache.discard_updates(work_item_id)
+
+        if store is not None:
+            store.put_meta(self.token_key, self.continuation_token)
+        print(f"Synced {revision_count} revisions of {len(merged) + len(stored) + len(dropped)} work items")
+        return True
@@ -0,0 +1,164 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from dateutil.parser import isoparse
+
+
+SECONDS_PER_DAY = 86400
+
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """
+    Parse an Azure DevOps ISO 8601 timestamp into epoch seconds
+
+    Args:
+        value: Timestamp string, e.g. '2024-03-01T10:15:00.123Z'
+
+    Returns:
+        Seconds since the epoch (UTC), or None if the value cannot be parsed
+    """
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        # fromisoformat rejects some variants Azure emits, e.g. 7-digit fractions
+        try:
+            timestamp = isoparse(value)
+        except (ValueError, OverflowError):
+            return None
+
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+class StateTimeline:
+    """Compact, time-ordered (state, timestamp) history of a single work item"""
+
+    __slots__ = ('states', 'timestamps')
+
+    def __init__(self, states: Tuple[str, ...] = (), timestamps: Tuple[float, ...] = ()):
+        """
+        Initialize the timeline
+
+        Args:
+            states: State entered by each transition, in time order
+            timestamps: Epoch seconds of each transition, same length as states
+        """
+        self.states = states
+        self.timestamps = timestamps
+
+    @classmethod
+    def from_updates(cls, updates: Dict, now: Optional[float] = None) -> 'StateTimeline':
+        """
+        Build a timeline from a work item's /updates payload
+
+        Every transition is timestamped with System.ChangedDate, falling back to revisedDate.
+        Transitions dated in the future are dropped.
+
+        Args:
+            updates: The API response of get_work_item_updates
+            now: Epoch seconds treated as the present (defaults to the current time)
+
+        Returns:
+            StateTimeline for the work item
+        """
+        if not updates or 'value' not in updates:
+            return cls()
+
+        if now is None:
+            now = datetime.now(timezone.utc).timestamp()
+
+        history = []
+        for update in updates['value']:
+            fields = update.get('fields')
+            if not fields or 'System.State' not in fields:
+                continue
+
+            new_state = fields['System.State'].get('newValue')
+            changed_date = fields.get('System.ChangedDate') or update.get('revisedDate')
+            if isinstance(changed_date, dict):
+                changed_date = changed_date.get('newValue')
+            if not new_state or not changed_date:
+                continue
+
+            timestamp = parse_timestamp(changed_date)
+            if timestamp is not None and timestamp <= now:
+                history.append((timestamp, new_state))
+
+        # Sort by timestamp ascending; the sort is stable for same-instant transitions
+        history.sort(key=lambda entry: entry[0])
+        return cls(
+            tuple(state for _, state in history),
+            tuple(timestamp for timestamp, _ in history)
+        )
+
+    def metrics(self, created: Optional[str] = None, now: Optional[float] = None) -> Dict:
+        """
+        Compute every per-item flow metric in a single pass over the timeline
+
+        Args:
+            created: Creation date of the work item (ISO 8601), used for lead time
+            now: Epoch seconds treated as the present (defaults to the current time)
+
+        Returns:
+            Dictionary containing:
+            - transition_count: dict with state names as keys and transition counts as values
+            - time_in_states: dict with state names as keys and total time in days as values
+            - resolved_count: number of transitions to 'Resolved'
+            - cycle_time: days from first 'Active' to last 'Closed', or None
+            - lead_time: days from creation to last 'Closed', or None
+        """
+        if now is None:
+            now = datetime.now(timezone.utc).timestamp()
+
+        transition_count = {}
+        time_in_states = {}
+        first_active = None
+        last_closed = None
+
+        count = len(self.states)
+        for i in range(count):
+            state = self.states[i]
+            timestamp = self.timestamps[i]
+            next_timestamp = self.timestamps[i + 1] if i + 1 < count else now
+
+            transition_count[state] = transition_count.get(state, 0) + 1
+            duration_days = max(0, (next_timestamp - timestamp) / SECONDS_PER_DAY)
+            time_in_states[state] = time_in_states.get(state, 0) + duration_days
+
+            if state == 'Active' and first_active is None:
+                first_active = timestamp
+            elif state == 'Closed':
+                last_closed = timestamp
+
+        cycle_time = None
+        if first_active is not None and last_closed is not None:
+            cycle_time = (last_closed - first_active) / SECONDS_PER_DAY
+
+        lead_time = None
+        created_timestamp = parse_timestamp(created) if created and created != 'N/A' else None
+        if created_timestamp is not None and last_closed is not None:
+            lead_time = (last_closed - created_timestamp) / SECONDS_PER_DAY
+
+        return {
+            'transition_count': transition_count,
+            'time_in_states': time_in_states,
+            'resolved_count': transition_count.get('Resolved', 0),
+            'cycle_time': cycle_time,
+            'lead_time': lead_time
+        }
+
+    def to_dict(self) -> Dict:
+        """Serialize the timeline to JSON-compatible data"""
+        return {'states': list(self.states), 'timestamps': list(self.timestamps)}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StateTimeline':
+        """Restore a timeline serialized with to_dict"""
+        return cls(tuple(data.get('states', ())), tuple(data.get('timestamps', ())))
+
+    def transitions(self) -> List[Tuple[str, float]]:
+        """Get the timeline as a list of (state, timestamp) pairs"""
+        return list(zip(self.states, self.timestamps))
+
+    def __len__(self) -> int:
+        return len(self.states)
@@ -6,36 +6,110 @@ from datetime import datetime
 import re
 import urllib.parse
 
+from StateTimeline import StateTimeline
+
 
 class Task:
-    """Represents a single Azure DevOps work item/task"""
+    """Represents a single Azure DevOps work item/task
+
+    Tasks are slotted and hold only their details and compact state timeline, so large
+    queries stay small in memory when the analyzer is created with keep_raw_updates=False.
+    """
+
+    __slots__ = ('id', 'analyzer', '_details', '_timeline', '_resolved_count', '_cycle_time',
+                 '_lead_time', '_state_info', '_collection')
     
     def __init__(self, task_id: int, analyzer):
         self.id = task_id
         self.analyzer = analyzer
+        # TaskCollection this task belongs to; lazy loads then cover every pending member at once
+        self._collection = None
         self._details = None
+        self._timeline = None
         self._resolved_count = None
-        self._updates = None
         self._cycle_time = None
         self._lead_time = None
         self._state_info = None
 
+    @classmethod
+    def from_data(cls, task_id: int, analyzer, details: Dict, timeline: StateTimeline) -> 'Task':
+        """
+        Create a Task from already known details and timeline, without touching the analyzer's cache
+
+        Args:
+            task_id: The ID of the work item
+            analyzer: Analyzer used if the task is refreshed later
+            details: Details dictionary as returned by get_work_item_details
+            timeline: State timeline of the work item
+
+        Returns:
+            Task with details and timeline loaded
+        """
+        task = cls(task_id, analyzer)
+        task.set_data(details, timeline)
+        return task
+
+    def set_data(self, details: Dict, timeline: StateTimeline):
+        """Use already fetched details and timeline instead of reading them from the analyzer"""
+        self._details = details
+        self._timeline = timeline
+
+    @property
+    def loaded(self) -> bool:
+        """Whether details and timeline are loaded, so no property needs the analyzer"""
+        return self._details is not None and self._timeline is not None
+
+    def refresh(self):
+        """Forget loaded details, timeline and metrics so they are read again from the analyzer"""
+        self._details = None
+        self._timeline = None
+        self._resolved_count = None
+        self._cycle_time = None
+        self._lead_time = None
+        self._state_info = None
+
+    def _check_can_load(self):
+        """Lazy loads call the analyzer's fetchers, which an async analyzer only has as coroutines"""
+        if self.analyzer.is_async:
+            raise RuntimeError(f"Task {self.id} is not loaded; await analyzer.load_metrics(tasks) first")
+
+    def _load_metrics(self):
+        """Compute every state metric in one pass over the task's timeline"""
+        # Lazy loads happen outside the phase, so fetching is not counted as metric computation
+        timeline = self.timeline
+        created = self.created_date
+        with self.analyzer.instrumentation.phase('metrics'):
+            metrics = timeline.metrics(created=created)
+
+        self._resolved_count = metrics['resolved_count']
+        self._cycle_time = round(metrics['cycle_time']) if metrics['cycle_time'] is not None else None
+        self._lead_time = round(metrics['lead_time']) if metrics['lead_time'] is not None else None
+
+        self._state_info = {}
+        # Get all unique states from both transition counts and time tracking
+        all_states = set()
+        all_states.update(metrics['transition_count'].keys())
+        all_states.update(metrics['time_in_states'].keys())
+
+        # Build the state info dictionary
+        for state in all_states:
+            self._state_info[state] = {
+                'count': metrics['transition_count'].get(state, 0),
+                'total_time': round(metrics['time_in_states'].get(state, 0.0), 2)
+            }
+
     @property
     def cycle_time(self) -> Optional[float]:
         """Get cycle time in days (from first active state to last closed state)"""
-        if self._cycle_time is None:
-            self._cycle_time = self.analyzer.calculate_cycle_time(self.id)
-            if self._cycle_time is not None:
-                self._cycle_time = round(self._cycle_time)
+        if self._state_info is None:
+            self._load_metrics()
         return self._cycle_time
     
     @property
     def lead_time(self) -> Optional[float]:
         """Get lead time in days (from creation to last closed state)"""
-        if self._lead_time is None:
-            self._lead_time = self.analyzer.calculate_lead_time(self.id)
-            if self._lead_time is not None:
-                self._lead_time = round(self._lead_time)
+        if self._state_info is None:
+            self._load_metrics()
         return self._lead_time
 
     @property
@@ -48,49 +122,49 @@ class Task:
             - total_time: total time spent in this state (days)
         """
         if self._state_info is None:
-            analysis = self.analyzer.analyze_state_transitions(self.id)
-            
-            self._state_info = {}
-            
-            # Get all unique states from both transition counts and time tracking
-            all_states = set()
-            all_states.update(analysis['transition_count'].keys())
-            all_states.update(analysis['time_in_states'].keys())
-            
-            # Build the state info dictionary
-            for state in all_states:
-                self._state_info[state] = {
-                    'count': analysis['transition_count'].get(state, 0),
-                    'total_time': round(analysis['time_in_states'].get(state, 0.0), 2)
-                }
-        
+            self._load_metrics()
         return self._state_info
 
+    @property
+    def timeline(self) -> StateTimeline:
+        """Get the (state, timestamp) timeline (lazy loaded from the analyzer's shared cache,
+        together with the rest of the task's collection)"""
+        if self._timeline is None and self._collection is not None:
+            self._collection.load()
+        if self._timeline is None:
+            self._check_can_load()
+            self._timeline = self.analyzer.get_state_timeline(self.id)
+        return self._timeline
+
     @property
     def updates(self) -> Dict:
-        """Get task updates/history (lazy loaded)"""
-        if self._updates is None:
-            self._updates = self.analyzer.get_work_item_updates(self.id)
-        return self._updates
+        """Get task updates/history (read from the analyzer's shared cache)"""
+        if self.analyzer.is_async:
+            raise RuntimeError(f"Use await analyzer.get_work_item_updates({self.id}) with an async analyzer")
+        return self.analyzer.get_work_item_updates(self.id)
     
     @property
     def details(self) -> Dict:
-        """Get task details (lazy loaded)
+        """Get task details (lazy loaded from the analyzer's shared cache)
             'id'
             'title'
             'type'
             'state'
             'created'
+            'rev'
         """
+        if self._details is None and self._collection is not None:
+            self._collection.load_details()
         if self._details is None:
+            self._check_can_load()
             self._details = self.analyzer.get_work_item_details(self.id)
         return self._details
     
     @property
     def resolved_count(self) -> int:
         """Get number of times this task was resolved (lazy loaded)"""
-        if self._resolved_count is None:
-            self._resolved_count = self.analyzer.count_resolved_transitions(self.id)
+        if self._state_info is None:
+            self._load_metrics()
         return self._resolved_count
     
     @property
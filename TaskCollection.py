@@ -0,0 +1,166 @@
+import threading
+import numpy as np
+from typing import Iterable
+
+from StateTimeline import StateTimeline
+from Task import Task
+from TransitionTable import TransitionTable
+
+
+class TaskCollection(list):
+    """List of Tasks that loads its members in bulk on first use
+
+    Tasks stay lazy, but the first property read on any member loads every member that is still
+    pending in one go: details through workitemsbatch, timelines through the analyzer's parallel
+    prefetch. Column accessors such as cycle_times return NumPy arrays over all members. With an
+    async analyzer, members must be loaded with its load_metrics instead.
+    """
+
+    def __init__(self, tasks: Iterable[Task] = (), analyzer=None, max_workers: int = 8):
+        """
+        Initialize the collection
+
+        Args:
+            tasks: Task objects
+            analyzer: Analyzer used for bulk loads (defaults to the first task's)
+            max_workers: Maximum number of concurrent requests when loading timelines
+        """
+        self._table = None
+        super().__init__(self._attach(tasks))
+        self.analyzer = analyzer if analyzer is not None or not self else self[0].analyzer
+        self.max_workers = max_workers
+        self._lock = threading.RLock()
+
+    def _attach(self, tasks: Iterable[Task]) -> list:
+        """Make added tasks load through this collection and drop the table built before the change"""
+        tasks = list(tasks)
+        for task in tasks:
+            task._collection = self
+        self._table = None
+        return tasks
+
+    def append(self, task: Task):
+        self._attach([task])
+        super().append(task)
+
+    def extend(self, tasks: Iterable[Task]):
+        super().extend(self._attach(tasks))
+
+    def insert(self, index: int, task: Task):
+        self._attach([task])
+        super().insert(index, task)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            super().__setitem__(index, self._attach(value))
+        else:
+            self._attach([value])
+            super().__setitem__(index, value)
+
+    def __iadd__(self, tasks: Iterable[Task]) -> 'TaskCollection':
+        self.extend(tasks)
+        return self
+
+    def __add__(self, tasks: Iterable[Task]) -> 'TaskCollection':
+        return TaskCollection(list(self) + list(tasks), self.analyzer, max_workers=self.max_workers)
+
+    # Removing or reordering members changes the table rows too
+    def __delitem__(self, index):
+        self._table = None
+        super().__delitem__(index)
+
+    def __imul__(self, count: int) -> 'TaskCollection':
+        self._table = None
+        return super().__imul__(count)
+
+    def remove(self, task: Task):
+        self._table = None
+        super().remove(task)
+
+    def pop(self, index: int = -1) -> Task:
+        self._table = None
+        return super().pop(index)
+
+    def clear(self):
+        self._table = None
+        super().clear()
+
+    def sort(self, *args, **kwargs):
+        self._table = None
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self._table = None
+        super().reverse()
+
+    def _check_can_load(self):
+        if self.analyzer.is_async:
+            raise RuntimeError("Tasks are not loaded; await analyzer.load_metrics(tasks) first")
+
+    def load_details(self):
+        """Load details of every member that has none yet, in batches of 200"""
+        with self._lock:
+            pending = [task for task in self if task._details is None]
+            if not pending:
+                return
+            self._check_can_load()
+            details = self.analyzer.get_work_items_details_batch([task.id for task in pending])
+            for task in pending:
+                if task.id in details:
+                    task._details = details[task.id]
+
+    def load(self):
+        """Load details and timelines of every pending member, fetching timelines in parallel"""
+        with self._lock:
+            pending = [task for task in self if not task.loaded]
+            if not pending:
+                return
+            self._check_can_load()
+            details, timelines = self.analyzer.prefetch([task.id for task in pending], max_workers=self.max_workers)
+            for task in pending:
+                # Items that failed to load keep an empty placeholder, like a lazy read would
+                task.set_data(task._details if task._details is not None else details.get(task.id, {}),
+                              task._timeline if task._timeline is not None
+                              else timelines.get(task.id, StateTimeline()))
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Work item IDs of the members"""
+        return np.array([task.id for task in self], dtype=np.int64)
+
+    @property
+    def table(self) -> TransitionTable:
+        """TransitionTable over all members, built once after loading them"""
+        with self._lock:
+            if self._table is None:
+                self.load()
+                self._table = TransitionTable.from_tasks(self)
+            return self._table
+
+    @property
+    def cycle_times(self) -> np.ndarray:
+        """Cycle time of each member in days (NaN if never closed)"""
+        return self.table.cycle_times()
+
+    @property
+    def lead_times(self) -> np.ndarray:
+        """Lead time of each member in days (NaN if never closed)"""
+        return self.table.lead_times()
+
+    @property
+    def resolved_counts(self) -> np.ndarray:
+        """Number of times each member was resolved"""
+        return self.table.resolved_counts()
+
+    def time_in_state(self, state: str) -> np.ndarray:
+        """Days each member spent in a state"""
+        table = self.table
+        code = table.state_index(state)
+        return table.time_in_states()[:, code] if code >= 0 else np.zeros(table.task_count)
+
+    def refresh(self):
+        """Forget loaded data of every member so it is loaded again on next use"""
+        with self._lock:
+            for task in self:
+                task.refresh()
+            self._table = None
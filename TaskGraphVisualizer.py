@@ -1,13 +1,41 @@
+import io
+import os
+import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
 import numpy as np
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from FlowAnalytics import FlowAnalytics
+from Instrumentation import Instrumentation
 from Task import Task
+from TransitionTable import TransitionTable
 
 class TaskGraphVisualizer:
     """Class for creating visualizations of Task state information"""
+
+    # Above this many tasks the stacked chart draws one artist per state instead of per bar
+    LARGE_CHART_TASKS = 150
+    # Most task ID labels drawn along the x-axis of one chart
+    MAX_TICK_LABELS = 60
+    # Widest stacked chart, in inches
+    MAX_FIGURE_WIDTH = 40
     
-    def __init__(self):
-        """Initialize the visualizer with color schemes"""
+    def __init__(self, headless: bool = False, instrumentation: Optional[Instrumentation] = None):
+        """
+        Initialize the visualizer with color schemes
+
+        Args:
+            headless: Never use pyplot or display charts; figures are rendered on the Agg canvas only,
+                      for batch jobs and services (see render_figure and iter_task_charts)
+            instrumentation: Metrics collector to time chart phases with, e.g. the analyzer's
+        """
+        self.headless = headless
+        self.instrumentation = instrumentation or Instrumentation()
         self.color_scheme = {
             'default': '#3B82F6',  # Blue
             'medium': '#F97316',   # Orange (2-4 transitions)
@@ -60,11 +88,10 @@ class TaskGraphVisualizer:
         
         for state_name, info in task.state_info.items():
             state_names.append(state_name)
-            durations.append(int(round(info['total_time'])))
+            durations.append(int(self._whole_days(info['total_time'])))
             counts.append(info['count'])
             colors.append(self.get_bar_color(info['count']))
         
-        print(durations)
         return state_names, durations, counts, colors
     
     
@@ -80,10 +107,21 @@ class TaskGraphVisualizer:
         Returns:
             matplotlib Figure object
         """
-        state_names, durations, counts, colors = self.prepare_chart_data(task)
+        self._load_tasks([task])
+        with self.instrumentation.phase('chart_data'):
+            chart_data = self.prepare_chart_data(task)
+        with self.instrumentation.phase('render_state_duration_chart'):
+            return self._render_state_duration_chart(task.id, task.title, chart_data,
+                                                     save_path=save_path, show_plot=show_plot)
+
+    def _render_state_duration_chart(self, task_id: int, title: str,
+                                     chart_data: Tuple[List[str], List[float], List[int], List[str]],
+                                     save_path: str = None, show_plot: bool = True, dpi: int = 300):
+        """Render a state duration chart from data prepared by prepare_chart_data"""
+        state_names, durations, counts, colors = chart_data
         
         # Create figure and axis
-        fig, ax = plt.subplots(figsize=(9, 6))
+        fig, ax = self._new_figure((9, 6), show_plot)
         
         # Create bars with different colors
         bars = ax.bar(state_names, durations, color=colors, alpha=0.8, edgecolor='black', linewidth=1)
@@ -91,11 +129,13 @@ class TaskGraphVisualizer:
         # Customize the chart
         ax.set_xlabel('State', fontsize=12, fontweight='bold')
         ax.set_ylabel('Duration (Days)', fontsize=12, fontweight='bold')
-        ax.set_title(f'Task {task.id}: Time Spent in Each State\n{task.title}', 
+        ax.set_title(f'Task {task_id}: Time Spent in Each State\n{title}', 
                     fontsize=14, fontweight='bold', pad=20)
         
         # Rotate x-axis labels for better readability
-        plt.xticks(rotation=45, ha='right')
+        ax.tick_params(axis='x', labelrotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment('right')
         
         # Add value labels on top of bars
         for bar, duration, count in zip(bars, durations, counts):
@@ -110,23 +150,23 @@ class TaskGraphVisualizer:
         
         # Create custom legend for color coding
         legend_elements = [
-            plt.Rectangle((0,0),1,1, facecolor=self.color_scheme['default'], label='1 transition'),
-            plt.Rectangle((0,0),1,1, facecolor=self.color_scheme['medium'], label='2-4 transitions'),
-            plt.Rectangle((0,0),1,1, facecolor=self.color_scheme['high'], label='5-8 transitions'),
-            plt.Rectangle((0,0),1,1, facecolor=self.color_scheme['critical'], label='9+ transitions')
+            Rectangle((0,0),1,1, facecolor=self.color_scheme['default'], label='1 transition'),
+            Rectangle((0,0),1,1, facecolor=self.color_scheme['medium'], label='2-4 transitions'),
+            Rectangle((0,0),1,1, facecolor=self.color_scheme['high'], label='5-8 transitions'),
+            Rectangle((0,0),1,1, facecolor=self.color_scheme['critical'], label='9+ transitions')
         ]
         ax.legend(handles=legend_elements, loc='upper right', title='Transition Count')
         
         # Adjust layout to prevent label cutoff
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Save if path provided
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
             print(f"Chart saved to: {save_path}")
         
         # Show plot if requested
-        if show_plot:
+        if show_plot and not self.headless:
             plt.show()
         
         return fig
@@ -142,68 +182,128 @@ class TaskGraphVisualizer:
         else:
             return "Blue"
     
-    def create_stacked_state_comparison_by_task(self, tasks: List[Task], save_path: str = None, show_plot: bool = True):
+    def _new_figure(self, figsize: Tuple[float, float], show_plot: bool):
         """
-        Create a stacked bar chart with Task IDs on X-axis and stacked states showing time duration.
-        
-        X-axis: Task IDs
-        Y-axis: Duration (Days)
-        Stacks: Different states (New, Active, Code Review, Resolved, Closed)
+        Create a figure and axis
+
+        Figures that will not be shown (and all figures in headless mode) skip pyplot and render
+        straight through the Agg canvas, so they are not tracked by pyplot's global state and are
+        freed with their last reference.
+        """
+        if show_plot and not self.headless:
+            return plt.subplots(figsize=figsize)
+
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig, fig.add_subplot()
+
+    def _load_tasks(self, tasks: List[Task], details: bool = True):
+        """Load timelines (and details) of tasks up front, so fetching is not counted as chart data work"""
+        with self.instrumentation.phase('load_tasks'):
+            load = getattr(tasks, 'load', None)
+            if load is not None:
+                # A TaskCollection loads all pending members in bulk
+                load()
+                return
+            for task in tasks:
+                task.timeline
+                if details:
+                    task.details
+
+    @staticmethod
+    def _whole_days(days):
+        """Round days to 2 decimals as Task.state_info does, then to whole days, so all charts agree"""
+        return np.rint(np.round(days, 2)).astype(int)
+
+    def _stacked_chart_data(self, tasks: List[Task]) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Prepare data for the stacked comparison chart
 
         Args:
             tasks: List of Task objects
-            save_path: Optional path to save the chart
-            show_plot: Whether to display the plot
-        """
-        if not tasks:
-            print("No tasks provided for comparison")
-            return
 
+        Returns:
+            Tuple of (task_ids, ordered_states, durations) where durations is a
+            (tasks x ordered_states) matrix of whole days
+        """
         # Define the order of states for consistent stacking
         state_order = ['New', 'Active', 'Code Review', 'Resolved', 'Closed']
-        
+
+        # Time in each state for all tasks at once, as a (tasks x states) matrix
+        # Creation dates are not needed, so lazy tasks outside a collection load no details
+        table = TransitionTable.from_tasks(tasks, with_created=False)
+        time_in_states = self._whole_days(table.time_in_states())
+
         # Get all states that actually exist in the tasks
-        all_found_states = {state for task in tasks for state in task.state_info}
+        all_found_states = table.state_names
         ordered_states = [state for state in state_order if state in all_found_states]
         
         # Add any additional states not in our predefined order
         additional_states = [state for state in all_found_states if state not in state_order]
         ordered_states.extend(additional_states)
 
-        # Prepare data
         task_ids = [str(task.id) for task in tasks]
-        
-        # Create a matrix: rows = states, columns = tasks
-        state_durations = {}
-        for state in reversed(ordered_states):
-            state_durations[state] = []
-            for task in tasks:
-                info = task.state_info.get(state)
-                duration = int(round(info['total_time'])) if info else 0
-                state_durations[state].append(duration)
+        columns = [table.state_index(state) for state in ordered_states]
+        return task_ids, ordered_states, time_in_states[:, columns]
+
+    def _draw_stacked_layers(self, ax, ordered_states: List[str], durations: np.ndarray):
+        """
+        Draw the stacked state layers, one bar per task
+
+        Small charts use regular bars. Large charts draw every state layer as a single
+        PolyCollection, so the artist count does not grow with the number of tasks.
+        """
+        task_count = durations.shape[0]
+        positions = np.arange(task_count)
+        large = task_count > self.LARGE_CHART_TASKS
 
-        # Create the plot
-        fig, ax = plt.subplots(figsize=(max(9, len(tasks) * 0.7), 6))
-        
         # Initialize bottom array for stacking
-        bottom = np.zeros(len(tasks))
-        
-        # Create stacked bars
-        bars = []
-        for state in reversed(ordered_states):
-            durations = state_durations[state]
+        bottom = np.zeros(task_count)
+
+        for column in reversed(range(len(ordered_states))):
+            state = ordered_states[column]
+            values = durations[:, column]
             color = self.state_colors.get(state, '#8B5CF6')  # Default purple if state not defined
-            
-            bar = ax.bar(task_ids, durations, bottom=bottom, 
-                        label=state, color=color, 
-                        edgecolor='black', linewidth=0.5, alpha=0.8)
-            bars.append(bar)
-            bottom += np.array(durations)
+
+            if large:
+                left = positions - 0.4
+                right = positions + 0.4
+                top = bottom + values
+                # One (4 corners x 2 coordinates) rectangle per task
+                vertices = np.stack([
+                    np.column_stack([left, bottom]),
+                    np.column_stack([left, top]),
+                    np.column_stack([right, top]),
+                    np.column_stack([right, bottom])
+                ], axis=1)
+                ax.add_collection(PolyCollection(vertices, facecolors=color, edgecolors='none',
+                                                 alpha=0.8, label=state))
+            else:
+                ax.bar(positions, values, bottom=bottom,
+                       label=state, color=color,
+                       edgecolor='black', linewidth=0.5, alpha=0.8)
+            bottom = bottom + values
+
+        ax.set_xlim(-0.6, task_count - 0.4)
+
+    def _render_stacked_chart(self, task_ids: List[str], ordered_states: List[str], durations: np.ndarray,
+                              title: str, save_path: str = None, show_plot: bool = True, dpi: int = None):
+        """Render a stacked comparison chart from prepared data"""
+        task_count = len(task_ids)
+        large = task_count > self.LARGE_CHART_TASKS
+        if dpi is None:
+            dpi = 100 if large else 300
+
+        # Create the plot
+        width = min(max(9, task_count * 0.7), self.MAX_FIGURE_WIDTH)
+        fig, ax = self._new_figure((width, 6), show_plot)
+
+        self._draw_stacked_layers(ax, ordered_states, durations)
 
         # Customize the chart
         ax.set_xlabel('Task ID', fontsize=12, fontweight='bold')
         ax.set_ylabel('Duration (Days)', fontsize=12, fontweight='bold')
-        ax.set_title('Time Spent in Each State by Task', fontsize=14, fontweight='bold')
+        ax.set_title(title, fontsize=14, fontweight='bold')
         
         # Add legend
         ax.legend(title="States", bbox_to_anchor=(1.05, 1), loc='upper left')
@@ -211,36 +311,382 @@ class TaskGraphVisualizer:
         # Add grid for better readability
         ax.grid(True, axis='y', alpha=0.3)
         ax.set_axisbelow(True)
-        
+
+        # Label at most MAX_TICK_LABELS tasks, evenly spaced
+        stride = max(1, -(-task_count // self.MAX_TICK_LABELS))
+        positions = np.arange(task_count)[::stride]
+        ax.set_xticks(positions)
+        ax.set_xticklabels([task_ids[i] for i in positions])
+
         # Rotate x-axis labels if there are many tasks
-        if len(tasks) > 10:
-            plt.xticks(rotation=45, ha='right')
+        if task_count > 10:
+            ax.tick_params(axis='x', labelrotation=45)
+            for label in ax.get_xticklabels():
+                label.set_horizontalalignment('right')
         
-        # Add total duration labels on top of each bar
-        for i, task in enumerate(tasks):
-            total_duration = sum(state_durations[state][i] for state in ordered_states)
-            if total_duration > 0:
-                ax.text(i, total_duration + max(bottom) * 0.01, 
-                       f'{total_duration}', 
-                       ha='center', va='bottom', fontsize=9, fontweight='bold')
+        # Add total duration labels on top of each bar, while they still fit
+        totals = durations.sum(axis=1)
+        max_total = totals.max() if task_count else 0
+        if task_count <= self.MAX_TICK_LABELS:
+            for i, total_duration in enumerate(totals):
+                if total_duration > 0:
+                    ax.text(i, total_duration + max_total * 0.01, 
+                           f'{total_duration}', 
+                           ha='center', va='bottom', fontsize=9, fontweight='bold')
         
         # Adjust y-axis to prevent label cutoff
-        max_total = max(sum(state_durations[state][i] for state in ordered_states) for i in range(len(tasks)))
         ax.set_ylim(0, max_total * 1.1)  # 10% padding above highest stack
 
-        plt.tight_layout()
+        fig.tight_layout()
 
         # Save if path provided
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
             print(f"Stacked state chart saved to: {save_path}")
 
         # Show plot if requested
-        if show_plot:
+        if show_plot and not self.headless:
             plt.show()
 
         return fig
+
+    def create_stacked_state_comparison_by_task(self, tasks: List[Task], save_path: str = None, show_plot: bool = True,
+                                                dpi: int = None):
+        """
+        Create a stacked bar chart with Task IDs on X-axis and stacked states showing time duration.
+        
+        X-axis: Task IDs
+        Y-axis: Duration (Days)
+        Stacks: Different states (New, Active, Code Review, Resolved, Closed)
+
+        Charts with more than LARGE_CHART_TASKS tasks are drawn in large mode: one artist per
+        state, a capped figure width, sparse task labels and a lower default resolution.
+
+        Args:
+            tasks: List of Task objects
+            save_path: Optional path to save the chart
+            show_plot: Whether to display the plot
+            dpi: Resolution of the saved chart (300, or 100 in large mode, by default)
+        """
+        if not tasks:
+            print("No tasks provided for comparison")
+            return
+
+        self._load_tasks(tasks, details=False)
+        with self.instrumentation.phase('chart_data'):
+            task_ids, ordered_states, durations = self._stacked_chart_data(tasks)
+        with self.instrumentation.phase('render_stacked_chart'):
+            return self._render_stacked_chart(task_ids, ordered_states, durations, 'Time Spent in Each State by Task',
+                                              save_path=save_path, show_plot=show_plot, dpi=dpi)
+
+    def create_paginated_stacked_comparison(self, tasks: List[Task], save_path_pattern: str,
+                                            tasks_per_page: int = 100, dpi: int = 150) -> List[str]:
+        """
+        Create the stacked comparison chart split across several figures
+
+        Metrics for all tasks are computed once; each page is rendered, saved and released
+        before the next one, so memory stays flat regardless of the number of tasks.
+
+        Args:
+            tasks: List of Task objects
+            save_path_pattern: Path for each page, with a {page} placeholder, e.g. 'stacked_{page}.png'
+            tasks_per_page: Number of tasks per figure
+            dpi: Resolution of the saved charts
+
+        Returns:
+            List of saved file paths
+        """
+        if not tasks:
+            print("No tasks provided for comparison")
+            return []
+
+        task_ids, ordered_states, durations = self._stacked_chart_data(tasks)
+        page_count = -(-len(task_ids) // tasks_per_page)
+        paths = []
+
+        for page in range(page_count):
+            start = page * tasks_per_page
+            end = start + tasks_per_page
+            path = save_path_pattern.format(page=page + 1)
+            fig = self._render_stacked_chart(
+                task_ids[start:end], ordered_states, durations[start:end],
+                f'Time Spent in Each State by Task ({page + 1}/{page_count})',
+                save_path=path, show_plot=False, dpi=dpi
+            )
+            self.release_figure(fig)
+            paths.append(path)
+
+        return paths
     
+    def export_task_charts(self, tasks: List[Task], output_dir: str, filename_pattern: str = 'task_{id}.png',
+                           max_workers: int = None, dpi: int = 150) -> List[str]:
+        """
+        Render a state duration chart per task across a process pool
+
+        Chart data is prepared here, so only plain lists and strings are sent to the workers,
+        never Task objects or their analyzer. Workers render without pyplot and close every figure.
+
+        Args:
+            tasks: List of Task objects
+            output_dir: Directory the charts are written to
+            filename_pattern: File name for each chart, with an {id} placeholder
+            max_workers: Number of worker processes (defaults to the CPU count)
+            dpi: Resolution of the saved charts
+
+        Returns:
+            List of saved file paths, in task order
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [
+            (task.id, task.title, self.prepare_chart_data(task),
+             os.path.join(output_dir, filename_pattern.format(id=task.id)), dpi, self.color_scheme)
+            for task in tasks
+        ]
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_render_state_duration_job, jobs, chunksize=8))
+
+    def export_paginated_stacked_comparison(self, tasks: List[Task], save_path_pattern: str,
+                                            tasks_per_page: int = 100, max_workers: int = None,
+                                            dpi: int = 150) -> List[str]:
+        """
+        Render the paginated stacked comparison chart with one page per worker process
+
+        Args:
+            tasks: List of Task objects
+            save_path_pattern: Path for each page, with a {page} placeholder, e.g. 'stacked_{page}.png'
+            tasks_per_page: Number of tasks per figure
+            max_workers: Number of worker processes (defaults to the CPU count)
+            dpi: Resolution of the saved charts
+
+        Returns:
+            List of saved file paths, in page order
+        """
+        if not tasks:
+            print("No tasks provided for comparison")
+            return []
+
+        task_ids, ordered_states, durations = self._stacked_chart_data(tasks)
+        page_count = -(-len(task_ids) // tasks_per_page)
+        jobs = []
+        for page in range(page_count):
+            start = page * tasks_per_page
+            end = start + tasks_per_page
+            jobs.append((
+                task_ids[start:end], ordered_states, durations[start:end],
+                f'Time Spent in Each State by Task ({page + 1}/{page_count})',
+                save_path_pattern.format(page=page + 1), dpi, self.state_colors
+            ))
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_render_stacked_page_job, jobs))
+
+    def create_cumulative_flow_diagram(self, tasks: List[Task], resolution: str = 'D',
+                                       start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                       save_path: str = None, show_plot: bool = True, dpi: int = 150):
+        """
+        Create a cumulative flow diagram: the number of tasks in each state over time, stacked
+
+        WIP per state comes from one sorted sweep over all state transitions (see
+        FlowAnalytics.wip_over_time), so the cost grows with transitions, not days x tasks.
+        Finished states are stacked at the bottom and the first workflow state on top.
+
+        Args:
+            tasks: List of Task objects (a TaskCollection reuses its TransitionTable)
+            resolution: 'D' for daily or 'H' for hourly samples
+            start: First day shown (defaults to the first transition)
+            end: Last day shown (defaults to now)
+            save_path: Optional path to save the chart
+            show_plot: Whether to display the plot
+            dpi: Resolution of the saved chart
+        """
+        if not tasks:
+            print("No tasks provided for the cumulative flow diagram")
+            return
+
+        self._load_tasks(tasks)
+        with self.instrumentation.phase('chart_data'):
+            table = getattr(tasks, 'table', None)
+            analytics = FlowAnalytics(table=table) if table is not None else FlowAnalytics(tasks)
+            samples, states, counts = analytics.wip_over_time(
+                resolution,
+                start=start.timestamp() if start is not None else None,
+                end=end.timestamp() if end is not None else None
+            )
+
+        with self.instrumentation.phase('render_cumulative_flow_diagram'):
+            # Known states in reverse workflow order, then any others, so Closed ends up at the bottom
+            known = [state for state in reversed(list(self.state_colors)) if state in states]
+            ordered_states = known + sorted(set(states) - set(known))
+            columns = [states.index(state) for state in ordered_states]
+            default_colors = plt.cm.tab20.colors
+
+            fig, ax = self._new_figure((12, 6), show_plot)
+            ax.stackplot(samples, counts[:, columns].T, labels=ordered_states,
+                         colors=[self.state_colors.get(state, default_colors[i % len(default_colors)])
+                                 for i, state in enumerate(ordered_states)],
+                         alpha=0.85, edgecolor='black', linewidth=0.3)
+
+            locator = mdates.AutoDateLocator()
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+            if len(samples):
+                ax.set_xlim(samples[0], samples[-1])
+            ax.set_ylim(0, None)
+
+            ax.set_xlabel('Date', fontsize=12, fontweight='bold')
+            ax.set_ylabel('Tasks', fontsize=12, fontweight='bold')
+            ax.set_title('Cumulative Flow Diagram', fontsize=14, fontweight='bold')
+            # Legend entries in stacking order, top state first
+            handles, labels = ax.get_legend_handles_labels()
+            ax.legend(handles[::-1], labels[::-1], title="States", bbox_to_anchor=(1.02, 1), loc='upper left')
+            ax.grid(True, axis='y', alpha=0.3)
+            ax.set_axisbelow(True)
+            fig.tight_layout()
+
+            if save_path:
+                fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+                print(f"Cumulative flow diagram saved to: {save_path}")
+
+            if show_plot and not self.headless:
+                plt.show()
+
+            return fig
+
+    def _render_forecast_histogram(self, distribution: np.ndarray, percentiles: Dict[float, str],
+                                   positions: Dict[float, float], title: str, xlabel: str,
+                                   save_path: str = None, show_plot: bool = True, dpi: int = 150):
+        """Histogram of a Monte Carlo distribution with a labelled line per confidence level"""
+        fig, ax = self._new_figure((10, 6), show_plot)
+
+        counts = np.bincount(distribution.astype(np.int64))
+        values = np.nonzero(counts)[0]
+        ax.bar(values, counts[values] / len(distribution) * 100, width=0.9,
+               color=self.state_colors['Active'], alpha=0.8, edgecolor='black', linewidth=0.5)
+
+        top = ax.get_ylim()[1]
+        for p, label in percentiles.items():
+            ax.axvline(positions[p], color=self.color_scheme['high'], linestyle='--', linewidth=1.5)
+            ax.text(positions[p], top * 0.95, f' {p:g}%: {label}', rotation=90,
+                    va='top', ha='right', fontsize=10, fontweight='bold')
+
+        ax.set_xlabel(xlabel, fontsize=12, fontweight='bold')
+        ax.set_ylabel('Trials (%)', fontsize=12, fontweight='bold')
+        ax.set_title(title, fontsize=14, fontweight='bold')
+        ax.grid(True, axis='y', alpha=0.3)
+        ax.set_axisbelow(True)
+        fig.tight_layout()
+
+        if save_path:
+            fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+            print(f"Forecast chart saved to: {save_path}")
+
+        if show_plot and not self.headless:
+            plt.show()
+
+        return fig
+
+    def create_when_done_chart(self, forecast: Dict, save_path: str = None, show_plot: bool = True, dpi: int = 150):
+        """
+        Chart the distribution of weeks needed from DeliveryForecaster.when_done, marking the
+        completion date at each confidence level
+
+        Args:
+            forecast: Result of DeliveryForecaster.when_done
+            save_path: Optional path to save the chart
+            show_plot: Whether to display the plot
+            dpi: Resolution of the saved chart
+        """
+        with self.instrumentation.phase('render_forecast_chart'):
+            return self._render_forecast_histogram(
+                forecast['distribution'],
+                {p: str(date) for p, date in forecast['dates'].items()},
+                forecast['weeks'],
+                f"When will {forecast['items']} items be done? (from {forecast['start']})",
+                'Weeks', save_path=save_path, show_plot=show_plot, dpi=dpi
+            )
+
+    def create_how_many_chart(self, forecast: Dict, save_path: str = None, show_plot: bool = True, dpi: int = 150):
+        """
+        Chart the distribution of items done from DeliveryForecaster.how_many, marking the
+        count reached at each confidence level
+
+        Args:
+            forecast: Result of DeliveryForecaster.how_many
+            save_path: Optional path to save the chart
+            show_plot: Whether to display the plot
+            dpi: Resolution of the saved chart
+        """
+        with self.instrumentation.phase('render_forecast_chart'):
+            return self._render_forecast_histogram(
+                forecast['distribution'],
+                {p: f'{items} items' for p, items in forecast['items'].items()},
+                forecast['items'],
+                f"How many items will be done in {forecast['weeks']} weeks?",
+                'Items done', save_path=save_path, show_plot=show_plot, dpi=dpi
+            )
+
+    def release_figure(self, fig: Figure):
+        """Free a figure and everything drawn on it, whether or not pyplot manages it"""
+        plt.close(fig)
+        fig.clear()
+
+    def render_figure(self, fig: Figure, writer: BinaryIO = None, format: str = 'png', dpi: int = 150) -> Optional[bytes]:
+        """
+        Render a figure to PNG or SVG and release it
+
+        Args:
+            fig: Figure returned by one of the chart methods
+            writer: Optional binary file-like object to stream the output to
+            format: Output format, e.g. 'png' or 'svg'
+            dpi: Resolution for raster formats
+
+        Returns:
+            The rendered bytes, or None when written to writer
+        """
+        buffer = writer if writer is not None else io.BytesIO()
+        try:
+            fig.savefig(buffer, format=format, dpi=dpi, bbox_inches='tight')
+        finally:
+            self.release_figure(fig)
+        return None if writer is not None else buffer.getvalue()
+
+    def render_state_duration_chart(self, task: Task, format: str = 'png', dpi: int = 150) -> bytes:
+        """Render a task's state duration chart to PNG or SVG bytes, without pyplot"""
+        fig = self._render_state_duration_chart(task.id, task.title, self.prepare_chart_data(task), show_plot=False)
+        return self.render_figure(fig, format=format, dpi=dpi)
+
+    def render_stacked_comparison(self, tasks: List[Task], format: str = 'png', dpi: int = None) -> Optional[bytes]:
+        """Render the stacked comparison chart to PNG or SVG bytes, without pyplot"""
+        if not tasks:
+            print("No tasks provided for comparison")
+            return None
+
+        task_ids, ordered_states, durations = self._stacked_chart_data(tasks)
+        if dpi is None:
+            dpi = 100 if len(task_ids) > self.LARGE_CHART_TASKS else 150
+        fig = self._render_stacked_chart(task_ids, ordered_states, durations, 'Time Spent in Each State by Task',
+                                         show_plot=False)
+        return self.render_figure(fig, format=format, dpi=dpi)
+
+    def iter_task_charts(self, tasks: Iterable[Task], format: str = 'png', dpi: int = 150) -> Iterator[Tuple[int, bytes]]:
+        """
+        Render state duration charts one task at a time
+
+        Each figure is released before the next one is drawn, so any number of charts can be
+        streamed to files, sockets or archives with constant memory.
+
+        Args:
+            tasks: Task objects, e.g. a generator from the analyzer's iter_tasks
+            format: Output format, e.g. 'png' or 'svg'
+            dpi: Resolution for raster formats
+
+        Yields:
+            Tuples of (task ID, rendered bytes)
+        """
+        for task in tasks:
+            yield task.id, self.render_state_duration_chart(task, format=format, dpi=dpi)
+
     def visualize_task(self, task: Task, save_path: str = None, show_summary: bool = True, show_chart: bool = True):
         """
         Complete visualization of a task (summary + chart)
@@ -257,4 +703,26 @@ class TaskGraphVisualizer:
         if show_chart:
             return self.create_state_duration_chart(task, save_path=save_path, show_plot=show_chart)
         
-        return None
\ No newline at end of file
+        return None
+
+
+def _render_state_duration_job(job: Tuple) -> str:
+    """Process pool worker: render one state duration chart from prepared data"""
+    task_id, title, chart_data, save_path, dpi, color_scheme = job
+    visualizer = TaskGraphVisualizer(headless=True)
+    visualizer.color_scheme = color_scheme
+    fig = visualizer._render_state_duration_chart(task_id, title, chart_data, save_path=save_path,
+                                                  show_plot=False, dpi=dpi)
+    visualizer.release_figure(fig)
+    return save_path
+
+
+def _render_stacked_page_job(job: Tuple) -> str:
+    """Process pool worker: render one page of the stacked comparison chart"""
+    task_ids, ordered_states, durations, title, save_path, dpi, state_colors = job
+    visualizer = TaskGraphVisualizer(headless=True)
+    visualizer.state_colors = state_colors
+    fig = visualizer._render_stacked_chart(task_ids, ordered_states, durations, title,
+                                           save_path=save_path, show_plot=False, dpi=dpi)
+    visualizer.release_figure(fig)
+    return save_path
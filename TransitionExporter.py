@@ -0,0 +1,187 @@
+import csv
+import numpy as np
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from Task import Task
+from TransitionTable import TransitionTable
+
+
+class TransitionExporter:
+    """Writes per-transition timelines and per-task summaries to CSV, Parquet or Arrow files
+
+    Tasks are processed in chunks, each chunk turned into columns and appended to the output,
+    so memory stays flat for any number of tasks. Parquet and Arrow output require pyarrow.
+    """
+
+    FORMATS = ('csv', 'parquet', 'arrow')
+    # Per-state summary columns used when tasks arrive as a stream and cannot be scanned up front
+    DEFAULT_STATES = ['New', 'Active', 'Code Review', 'Resolved', 'Closed']
+
+    def __init__(self, chunk_size: int = 1000):
+        """
+        Initialize the exporter
+
+        Args:
+            chunk_size: Number of tasks converted and written at a time
+        """
+        self.chunk_size = chunk_size
+
+    def _chunks(self, tasks: Iterable[Task]) -> Iterator[List[Task]]:
+        iterator = iter(tasks)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _transition_columns(self, chunk: List[Task]) -> dict:
+        table = TransitionTable.from_tasks(chunk)
+        states = np.array(table.state_names + [''], dtype=object)
+
+        # The state left by each transition is the previous one of the same task, if any
+        previous_code = np.full(len(table.state_code), -1, dtype=np.int64)
+        if len(table.state_code):
+            follows = np.zeros(len(table.task_index), dtype=bool)
+            follows[1:] = table.task_index[1:] == table.task_index[:-1]
+            previous_code[1:][follows[1:]] = table.state_code[:-1][follows[1:]]
+
+        types = np.array([task.work_item_type for task in chunk], dtype=object)
+        return {
+            'task_id': table.task_ids[table.task_index],
+            'type': types[table.task_index],
+            'from_state': states[previous_code],
+            'to_state': states[table.state_code],
+            'timestamp': np.rint(table.timestamps * 1000).astype(np.int64).astype('datetime64[ms]'),
+            'duration_days': table.durations()
+        }
+
+    def _summary_columns(self, chunk: List[Task], states: List[str]) -> dict:
+        table = TransitionTable.from_tasks(chunk)
+        time_in_states = table.time_in_states()
+
+        columns = {
+            'task_id': table.task_ids,
+            'title': np.array([task.title for task in chunk], dtype=object),
+            'type': np.array([task.work_item_type for task in chunk], dtype=object),
+            'state': np.array([task.current_state for task in chunk], dtype=object),
+            'cycle_time': table.cycle_times(),
+            'lead_time': table.lead_times(),
+            'resolved_count': table.resolved_counts()
+        }
+        for state in states:
+            code = table.state_index(state)
+            columns[f'time_{state}'] = time_in_states[:, code] if code >= 0 else np.zeros(table.task_count)
+        return columns
+
+    def _discover_states(self, tasks: Iterable[Task]) -> List[str]:
+        if not isinstance(tasks, Sequence):
+            return list(self.DEFAULT_STATES)
+
+        found = {state for task in tasks for state in task.timeline.states}
+        states = [state for state in self.DEFAULT_STATES if state in found]
+        states.extend(sorted(found - set(self.DEFAULT_STATES)))
+        return states
+
+    def export_transitions(self, tasks: Iterable[Task], path: str, format: str = 'csv') -> int:
+        """
+        Write one row per state transition: task_id, type, from_state, to_state, timestamp, duration_days
+
+        duration_days is the time until the task's next transition, or until now for the last one.
+
+        Args:
+            tasks: Task objects (a list or a stream such as iter_tasks)
+            path: Output file path
+            format: 'csv', 'parquet' or 'arrow'
+
+        Returns:
+            Number of rows written
+        """
+        return self._write((self._transition_columns(chunk) for chunk in self._chunks(tasks)), path, format)
+
+    def export_task_summaries(self, tasks: Iterable[Task], path: str, format: str = 'csv',
+                              states: Optional[List[str]] = None) -> int:
+        """
+        Write one row per task: task_id, title, type, state, cycle_time, lead_time, resolved_count
+        and a time_<state> column with the days spent in each state
+
+        Args:
+            tasks: Task objects (a list or a stream such as iter_tasks)
+            path: Output file path
+            format: 'csv', 'parquet' or 'arrow'
+            states: States to write time columns for (defaults to every state in a task list,
+                    or DEFAULT_STATES for a stream)
+
+        Returns:
+            Number of rows written
+        """
+        states = states or self._discover_states(tasks)
+        return self._write((self._summary_columns(chunk, states) for chunk in self._chunks(tasks)), path, format)
+
+    def _write(self, chunks: Iterable[dict], path: str, format: str) -> int:
+        if format not in self.FORMATS:
+            raise ValueError(f"Unsupported export format {format!r}, expected one of {self.FORMATS}")
+        if format == 'csv':
+            return self._write_csv(chunks, path)
+        return self._write_arrow(chunks, path, format)
+
+    def _write_csv(self, chunks: Iterable[dict], path: str) -> int:
+        rows = 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            header_written = False
+            for columns in chunks:
+                if not header_written:
+                    writer.writerow(columns.keys())
+                    header_written = True
+
+                values = []
+                for name, column in columns.items():
+                    if column.dtype.kind == 'M':
+                        column = np.datetime_as_string(column, unit='s', timezone='UTC')
+                    elif column.dtype.kind == 'f':
+                        column = np.where(np.isnan(column), None, np.round(column, 4))
+                    values.append(column.tolist())
+                writer.writerows(zip(*values))
+                rows += len(columns['task_id'])
+        return rows
+
+    def _write_arrow(self, chunks: Iterable[dict], path: str, format: str) -> int:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(f"Exporting to {format} requires pyarrow (pip install pyarrow)")
+
+        rows = 0
+        writer = None
+        try:
+            for columns in chunks:
+                # Empty chunks carry no type information for their columns
+                if not len(columns['task_id']):
+                    continue
+
+                arrays = {}
+                for name, column in columns.items():
+                    if column.dtype.kind == 'M':
+                        arrays[name] = pa.array(column, type=pa.timestamp('ms', tz='UTC'))
+                    elif column.dtype.kind == 'f':
+                        arrays[name] = pa.array(column, from_pandas=True)
+                    else:
+                        arrays[name] = pa.array(column.tolist() if column.dtype == object else column)
+                batch = pa.RecordBatch.from_pydict(arrays)
+
+                if writer is None:
+                    if format == 'parquet':
+                        writer = pq.ParquetWriter(path, batch.schema)
+                    else:
+                        writer = pa.ipc.new_file(path, batch.schema)
+                if format == 'parquet':
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
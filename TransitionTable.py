@@ -0,0 +1,221 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from StateTimeline import SECONDS_PER_DAY, StateTimeline, parse_timestamp
+
+
+class TransitionTable:
+    """Columnar view of the state transitions of many tasks, for vectorized flow metrics
+
+    Transitions are stored as parallel arrays sorted by task and then by time:
+    - task_index: position of the task in task_ids
+    - state_code: position of the entered state in state_names
+    - timestamps: epoch seconds of the transition
+    """
+
+    def __init__(self, task_ids: np.ndarray, state_names: List[str], task_index: np.ndarray,
+                 state_code: np.ndarray, timestamps: np.ndarray, created: Optional[np.ndarray] = None,
+                 now: Optional[float] = None):
+        """
+        Initialize the table
+
+        Args:
+            task_ids: Work item IDs, one per task
+            state_names: State names, indexed by state_code
+            task_index: Task position of each transition
+            state_code: State code of each transition
+            timestamps: Epoch seconds of each transition
+            created: Epoch seconds of each task's creation (NaN when unknown)
+            now: Epoch seconds treated as the present (defaults to the current time)
+        """
+        self.task_ids = task_ids
+        self.state_names = state_names
+        self.task_index = task_index
+        self.state_code = state_code
+        self.timestamps = timestamps
+        self.created = created if created is not None else np.full(len(task_ids), np.nan)
+        self.now = now if now is not None else datetime.now(timezone.utc).timestamp()
+
+    @classmethod
+    def from_timelines(cls, task_ids: Sequence[int], timelines: Iterable[StateTimeline],
+                       created: Optional[Sequence[str]] = None, now: Optional[float] = None) -> 'TransitionTable':
+        """
+        Build a table from per-task timelines
+
+        Args:
+            task_ids: Work item IDs
+            timelines: StateTimeline of each task, same order as task_ids
+            created: Optional creation dates (ISO 8601) of each task, used for lead time
+            now: Epoch seconds treated as the present (defaults to the current time)
+
+        Returns:
+            TransitionTable over all tasks
+        """
+        state_codes = {}
+        task_index = []
+        state_code = []
+        timestamps = []
+
+        for index, timeline in enumerate(timelines):
+            for state in timeline.states:
+                code = state_codes.setdefault(state, len(state_codes))
+                state_code.append(code)
+            task_index.extend([index] * len(timeline))
+            timestamps.extend(timeline.timestamps)
+
+        created_epochs = None
+        if created is not None:
+            # Unparseable dates come back as None, which NumPy stores as NaN
+            created_epochs = np.array([
+                parse_timestamp(value) if value and value != 'N/A' else None for value in created
+            ], dtype=float)
+
+        return cls(
+            np.asarray(task_ids, dtype=np.int64),
+            list(state_codes),
+            np.asarray(task_index, dtype=np.int64),
+            np.asarray(state_code, dtype=np.int64),
+            np.asarray(timestamps, dtype=float),
+            created=created_epochs,
+            now=now
+        )
+
+    @classmethod
+    def from_tasks(cls, tasks: Sequence, now: Optional[float] = None, with_created: bool = True) -> 'TransitionTable':
+        """
+        Build a table from Task objects
+
+        Args:
+            tasks: Task objects
+            now: Epoch seconds treated as the present (defaults to the current time)
+            with_created: Read creation dates, needed for lead times; lazy tasks then load their details
+
+        Returns:
+            TransitionTable over all tasks
+        """
+        return cls.from_timelines(
+            [task.id for task in tasks],
+            [task.timeline for task in tasks],
+            created=[task.created_date for task in tasks] if with_created else None,
+            now=now
+        )
+
+    @property
+    def task_count(self) -> int:
+        return len(self.task_ids)
+
+    @property
+    def state_count(self) -> int:
+        return len(self.state_names)
+
+    def state_index(self, state_name: str) -> int:
+        """Get the code of a state, or -1 if no task ever entered it"""
+        try:
+            return self.state_names.index(state_name)
+        except ValueError:
+            return -1
+
+    def durations(self) -> np.ndarray:
+        """Get the time in days spent after each transition, until the task's next transition or now"""
+        if not len(self.timestamps):
+            return np.zeros(0)
+
+        next_timestamps = np.empty_like(self.timestamps)
+        next_timestamps[:-1] = self.timestamps[1:]
+        # The last transition of each task lasts until now
+        is_last = np.empty(len(self.task_index), dtype=bool)
+        is_last[:-1] = self.task_index[:-1] != self.task_index[1:]
+        is_last[-1] = True
+        next_timestamps[is_last] = self.now
+
+        return np.maximum(0, (next_timestamps - self.timestamps) / SECONDS_PER_DAY)
+
+    def _per_task_state(self, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        flat_index = self.task_index * self.state_count + self.state_code
+        totals = np.bincount(flat_index, weights=weights, minlength=self.task_count * self.state_count)
+        return totals.reshape(self.task_count, self.state_count)
+
+    def time_in_states(self) -> np.ndarray:
+        """Get total days spent in each state, as a (tasks x states) matrix"""
+        return self._per_task_state(self.durations())
+
+    def transition_counts(self) -> np.ndarray:
+        """Get number of transitions to each state, as a (tasks x states) matrix"""
+        return self._per_task_state().astype(np.int64)
+
+    def first_entry(self, state_name: str) -> np.ndarray:
+        """Get the epoch seconds each task first entered a state (NaN if it never did)"""
+        first = np.full(self.task_count, np.inf)
+        mask = self.state_code == self.state_index(state_name)
+        np.minimum.at(first, self.task_index[mask], self.timestamps[mask])
+        first[np.isinf(first)] = np.nan
+        return first
+
+    def last_entry(self, state_name: str) -> np.ndarray:
+        """Get the epoch seconds each task last entered a state (NaN if it never did)"""
+        last = np.full(self.task_count, -np.inf)
+        mask = self.state_code == self.state_index(state_name)
+        np.maximum.at(last, self.task_index[mask], self.timestamps[mask])
+        last[np.isinf(last)] = np.nan
+        return last
+
+    def cycle_times(self) -> np.ndarray:
+        """Get days from first 'Active' to last 'Closed' per task (NaN when not applicable)"""
+        return (self.last_entry('Closed') - self.first_entry('Active')) / SECONDS_PER_DAY
+
+    def lead_times(self) -> np.ndarray:
+        """Get days from creation to last 'Closed' per task (NaN when not applicable)"""
+        return (self.last_entry('Closed') - self.created) / SECONDS_PER_DAY
+
+    def resolved_counts(self) -> np.ndarray:
+        """Get number of transitions to 'Resolved' per task"""
+        code = self.state_index('Resolved')
+        if code < 0:
+            return np.zeros(self.task_count, dtype=np.int64)
+        return self.transition_counts()[:, code]
+
+    @staticmethod
+    def percentiles(values: np.ndarray, q: Sequence[float] = (50, 85, 95)) -> Dict[float, float]:
+        """
+        Get percentiles of a metric, ignoring tasks where it is not defined
+
+        Args:
+            values: Per-task metric values (NaN for undefined)
+            q: Percentiles to compute
+
+        Returns:
+            Dictionary mapping each percentile to its value (NaN if no task has the metric)
+        """
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return {p: float('nan') for p in q}
+        return dict(zip(q, np.percentile(values, q).tolist()))
+
+    def summary(self, q: Sequence[float] = (50, 85, 95)) -> Dict:
+        """
+        Aggregate flow metrics over all tasks
+
+        Args:
+            q: Percentiles to compute
+
+        Returns:
+            Dictionary containing:
+            - cycle_time: percentiles of cycle time (days)
+            - lead_time: percentiles of lead time (days)
+            - time_in_states: dict with state names as keys and percentiles of days spent as values
+            - total_time_in_states: dict with state names as keys and total days across tasks as values
+        """
+        time_in_states = self.time_in_states()
+        entered = self.transition_counts() > 0
+
+        return {
+            'cycle_time': self.percentiles(self.cycle_times(), q),
+            'lead_time': self.percentiles(self.lead_times(), q),
+            'time_in_states': {
+                # Only tasks that entered a state count towards its distribution
+                state: self.percentiles(np.where(entered[:, code], time_in_states[:, code], np.nan), q)
+                for code, state in enumerate(self.state_names)
+            },
+            'total_time_in_states': dict(zip(self.state_names, time_in_states.sum(axis=0).tolist()))
+        }
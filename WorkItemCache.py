@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class WorkItemCache:
+    """Bounded LRU store for work item details, updates and state timelines, shared by the analyzer and its Tasks"""
+
+    def __init__(self, max_items: Optional[int] = 10000):
+        """
+        Initialize the cache
+
+        Args:
+            max_items: Maximum number of work items kept per kind (None for unbounded)
+        """
+        self.max_items = max_items
+        self._details = OrderedDict()
+        self._updates = OrderedDict()
+        self._timelines = OrderedDict()
+        # Prefetching fills the cache from worker threads
+        self._lock = threading.Lock()
+
+    def _get(self, store: OrderedDict, work_item_id: int) -> Optional[Dict]:
+        with self._lock:
+            value = store.get(work_item_id)
+            if value is not None:
+                store.move_to_end(work_item_id)
+            return value
+
+    def _put(self, store: OrderedDict, work_item_id: int, value: Dict):
+        with self._lock:
+            store[work_item_id] = value
+            store.move_to_end(work_item_id)
+            if self.max_items is not None:
+                while len(store) > self.max_items:
+                    store.popitem(last=False)
+
+    def get_details(self, work_item_id: int) -> Optional[Dict]:
+        """Get cached details for a work item, or None if not cached"""
+        return self._get(self._details, work_item_id)
+
+    def put_details(self, work_item_id: int, details: Dict):
+        """Store details for a work item"""
+        self._put(self._details, work_item_id, details)
+
+    def get_updates(self, work_item_id: int) -> Optional[Dict]:
+        """Get cached updates for a work item, or None if not cached"""
+        return self._get(self._updates, work_item_id)
+
+    def put_updates(self, work_item_id: int, updates: Dict):
+        """Store updates for a work item"""
+        self._put(self._updates, work_item_id, updates)
+
+    def discard_updates(self, work_item_id: int):
+        """Drop the raw updates of a work item, keeping its details and timeline"""
+        with self._lock:
+            self._updates.pop(work_item_id, None)
+
+    def discard_timeline(self, work_item_id: int):
+        """Drop the state timeline of a work item, keeping its details and updates"""
+        with self._lock:
+            self._timelines.pop(work_item_id, None)
+
+    def get_timeline(self, work_item_id: int):
+        """Get the cached state timeline for a work item, or None if not cached"""
+        return self._get(self._timelines, work_item_id)
+
+    def put_timeline(self, work_item_id: int, timeline):
+        """Store the state timeline for a work item"""
+        self._put(self._timelines, work_item_id, timeline)
+
+    def invalidate(self, work_item_id: int):
+        """Drop everything cached for a single work item"""
+        with self._lock:
+            self._details.pop(work_item_id, None)
+            self._updates.pop(work_item_id, None)
+            self._timelines.pop(work_item_id, None)
+
+    def clear(self):
+        """Drop everything cached"""
+        with self._lock:
+            self._details.clear()
+            self._updates.clear()
+            self._timelines.clear()
+
+    def __contains__(self, work_item_id: int) -> bool:
+        with self._lock:
+            return work_item_id in self._details or work_item_id in self._updates
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(set(self._details) | set(self._updates))
@@ -0,0 +1,119 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict
+
+import matplotlib
+matplotlib.use('Agg')
+
+from FakeAzureDevOpsServer import FakeAzureDevOpsServer
+from HistoryStore import HistoryStore
+from TaskGraphVisualizer import TaskGraphVisualizer
+from main import AzureDevOpsHistoryAnalyzer
+
+
+@contextmanager
+def phase(timings: Dict[str, float], name: str):
+    """Record the wall time of a block under the given phase name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def run_benchmark(server: FakeAzureDevOpsServer, prefetch: bool, max_workers: int, render: bool,
+                  cache_dir: str = None) -> Dict:
+    """
+    Run one full analysis against the stand-in server
+
+    Args:
+        server: Running stand-in server
+        prefetch: Fetch all tasks up front in parallel
+        max_workers: Concurrency used when prefetching
+        render: Also render the stacked comparison chart
+        cache_dir: Optional history store directory, to measure warm runs
+
+    Returns:
+        Dictionary with wall time, request counts, peak memory and per-phase timings
+    """
+    server.reset_counts()
+    timings = {}
+    history_store = HistoryStore(cache_dir) if cache_dir else None
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    analyzer = AzureDevOpsHistoryAnalyzer(server.organization, server.project, 'bench-token', server.query_id,
+                                          cache_size=None, host=server.host, pool_size=max(max_workers, 1),
+                                          history_store=history_store, keep_raw_updates=False)
+
+    with phase(timings, 'get_all_tasks'):
+        tasks = analyzer.get_all_tasks(prefetch=prefetch, max_workers=max_workers)
+
+    with phase(timings, 'metrics'):
+        for task in tasks:
+            task.state_info
+            task.cycle_time
+
+    if render:
+        visualizer = TaskGraphVisualizer()
+        with phase(timings, 'render'), tempfile.TemporaryDirectory() as output_dir:
+            fig = visualizer.create_stacked_state_comparison_by_task(
+                tasks, save_path=os.path.join(output_dir, 'stacked.png'), show_plot=False)
+            matplotlib.pyplot.close(fig)
+
+    wall_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if history_store is not None:
+        history_store.close()
+
+    return {
+        'tasks': len(tasks),
+        'wall_time': wall_time,
+        'requests': server.total_requests,
+        'requests_by_endpoint': dict(server.request_counts),
+        'peak_memory_mb': peak_memory / (1024 * 1024),
+        'phases': timings
+    }
+
+
+def print_report(label: str, result: Dict):
+    """Print one benchmark result"""
+    print(f"{label}: {result['tasks']} tasks in {result['wall_time']:.2f}s, "
+          f"{result['requests']} requests, peak memory {result['peak_memory_mb']:.1f} MB")
+    for endpoint, count in sorted(result['requests_by_endpoint'].items()):
+        print(f"  {endpoint}: {count} requests")
+    for name, seconds in result['phases'].items():
+        print(f"  {name}: {seconds:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analyzer against a local Azure DevOps stand-in')
+    parser.add_argument('--items', type=int, default=500, help='number of synthetic work items')
+    parser.add_argument('--transitions', type=int, default=8, help='average state transitions per item')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds of latency per request')
+    parser.add_argument('--workers', type=int, default=16, help='concurrency when prefetching')
+    parser.add_argument('--no-render', action='store_true', help='skip rendering the stacked chart')
+    args = parser.parse_args()
+
+    with FakeAzureDevOpsServer(item_count=args.items, transitions_per_item=args.transitions,
+                               latency=args.latency) as server:
+        render = not args.no_render
+        print_report('lazy', run_benchmark(server, prefetch=False, max_workers=1, render=render))
+        print_report('prefetch', run_benchmark(server, prefetch=True, max_workers=args.workers, render=render))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            print_report('prefetch, cold store', run_benchmark(server, prefetch=True, max_workers=args.workers,
+                                                               render=render, cache_dir=cache_dir))
+            print_report('prefetch, warm store', run_benchmark(server, prefetch=True, max_workers=args.workers,
+                                                               render=render, cache_dir=cache_dir))
+
+
+if __name__ == "__main__":
+    main()
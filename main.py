@@ -1,18 +1,36 @@
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from typing import List, Dict, Optional
-import base64
-from datetime import datetime, timezone
+from typing import List, Dict, Iterator, Optional, Tuple
 import re
+import threading
+import time
 import urllib.parse
-from dateutil.parser import isoparse
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from AzureDevOpsAnalyzerBase import AzureDevOpsAnalyzerBase
 from Task import Task
+from TaskCollection import TaskCollection
 from TaskGraphVisualizer import TaskGraphVisualizer
-
-
-class AzureDevOpsHistoryAnalyzer:
-    def __init__(self, organization: str, project: str, personal_access_token: str, tasks_id_query_id: str):
+from DeltaFlowReport import DeltaFlowReport
+from WorkItemCache import WorkItemCache
+from HistoryStore import HistoryStore
+from StateTimeline import StateTimeline
+from Instrumentation import Instrumentation
+from ReportingRevisionSync import ReportingRevisionSync
+
+
+class AzureDevOpsHistoryAnalyzer(AzureDevOpsAnalyzerBase):
+    HISTORY_BACKENDS = ('updates', 'reporting')
+
+    def __init__(self, organization: str, project: str, personal_access_token: str, tasks_id_query_id: str,
+                 cache_size: Optional[int] = 10000, max_retries: int = 5, backoff_factor: float = 0.5,
+                 history_store: Optional[HistoryStore] = None, pool_size: int = 16,
+                 timeout: Tuple[float, float] = (10, 60), host: str = 'https://dev.azure.com',
+                 transport: Optional[BaseAdapter] = None, keep_raw_updates: bool = True,
+                 instrumentation: Optional[Instrumentation] = None, lean_updates: bool = False,
+                 history_backend: str = 'updates', cache: Optional[WorkItemCache] = None):
         """
         Initialize the Azure DevOps API client
 
@@ -21,72 +39,262 @@ class AzureDevOpsHistoryAnalyzer:
             project: Your project name
             personal_access_token: Your PAT for authentication
             tasks_id_query_id: Query ID for getting task IDs
+            cache_size: Maximum number of work items kept in the in-memory cache (None for unbounded)
+            max_retries: How many times a throttled or failed request is retried
+            backoff_factor: Base delay in seconds for the jittered exponential backoff
+            history_store: Optional persistent store; updates of unchanged items are then reused across runs
+            pool_size: Number of keep-alive connections kept open; should be at least the prefetch concurrency
+            timeout: (connect, read) timeout in seconds for every request
+            host: Base URL of the Azure DevOps server, e.g. a local stand-in server for tests
+            transport: Optional requests adapter used instead of the pooled HTTP adapter
+            keep_raw_updates: Keep raw /updates payloads in memory after their timeline is built
+            instrumentation: Metrics collector to report to (a new one is created by default)
+            lean_updates: Keep only state-change revisions with their timestamps from /updates (see get_work_item_updates)
+            history_backend: 'updates' to fetch histories per item, or 'reporting' to sync them in bulk
+                             from the reporting revisions feed when prefetching (see ReportingRevisionSync)
+            cache: Cache shared with other analyzers of the same organization (cache_size is then ignored)
+        """
+        if history_backend not in self.HISTORY_BACKENDS:
+            raise ValueError(f"Unsupported history backend {history_backend!r}, expected one of {self.HISTORY_BACKENDS}")
+
+        super().__init__(organization, project, personal_access_token, tasks_id_query_id,
+                         cache_size=cache_size, max_retries=max_retries, backoff_factor=backoff_factor,
+                         history_store=history_store, timeout=timeout, host=host,
+                         keep_raw_updates=keep_raw_updates, instrumentation=instrumentation,
+                         lean_updates=lean_updates, cache=cache)
+
+        # One pooled session keeps connections alive across all requests
+        if transport is None:
+            # Connection failures are retried by the adapter; throttling and 5xx are handled in _request
+            transport = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=Retry(total=max_retries, connect=max_retries, read=0, status=0,
+                                  backoff_factor=backoff_factor)
+            )
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', transport)
+        self.session.mount('http://', transport)
+
+        # Items the reporting feed does not cover still go through the per-item /updates path
+        self.revision_sync = ReportingRevisionSync(self) if history_backend == 'reporting' else None
+        # Timelines being fetched, so concurrent readers of the same item wait instead of refetching
+        self._inflight: Dict[int, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def _request(self, method: str, url: str, params: Optional[Dict] = None, body: Optional[Dict] = None) -> requests.Response:
         """
-        self.organization = organization
-        self.project = project
-        self.base_url = f"https://dev.azure.com/{organization}/{project}/_apis"
-        self.tasks_id_query_id = tasks_id_query_id
+        Send a request through the pooled session, retrying on 429, transient 5xx responses and read timeouts
 
-        # Create basic auth header
-        auth_string = f":{personal_access_token}"
-        auth_bytes = auth_string.encode('ascii')
-        auth_b64 = base64.b64encode(auth_bytes).decode('ascii')
+        Args:
+            method: HTTP method
+            url: The URL to request
+            params: Optional query parameters
+            body: Optional JSON body
 
-        self.headers = {
-            'Authorization': f'Basic {auth_b64}',
-            'Content-Type': 'application/json'
-        }
+        Returns:
+            The last response received
+        """
+        endpoint = self._endpoint_name(url)
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, json=body, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                self.instrumentation.record_request(endpoint, time.perf_counter() - start, 0, 0)
+                # Connect timeouts were already retried by the adapter; only read timeouts are retried here
+                if (not isinstance(e, requests.exceptions.Timeout) or isinstance(e, requests.exceptions.ConnectTimeout)
+                        or attempt == self.max_retries):
+                    raise
+                self.instrumentation.record_retry(endpoint, 0)
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            self.instrumentation.record_request(endpoint, time.perf_counter() - start,
+                                                self._transferred_bytes(response), response.status_code)
+            if response.status_code not in self.RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            self.instrumentation.record_retry(endpoint, response.status_code)
+            time.sleep(self._retry_delay(attempt, response))
+
+        return response
+
+    @staticmethod
+    def _transferred_bytes(response: requests.Response) -> int:
+        """Size of a response body as sent over the wire, before gzip or deflate decoding"""
+        # Reading content first makes sure the whole body went through the raw stream
+        content = response.content
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit():
+            return int(length)
+        # Otherwise the raw stream position counts the encoded bytes read. urllib3 does not count
+        # chunked bodies and reports 0, so those fall back to the decoded size
+        tell = getattr(response.raw, 'tell', None)
+        if tell is not None:
+            try:
+                position = tell()
+            except (OSError, ValueError):
+                position = 0
+            if position:
+                return position
+        return len(content)
+
+    def _get(self, url: str, params: Optional[Dict] = None) -> requests.Response:
+        """GET a URL with retries"""
+        return self._request('GET', url, params=params)
+
+    def _post(self, url: str, body: Dict, params: Optional[Dict] = None) -> requests.Response:
+        """POST a JSON body to a URL with retries"""
+        return self._request('POST', url, params=params, body=body)
 
     def get_work_item_updates(self, work_item_id: int) -> Dict:
         """
         Get all updates/revisions for a specific work item
 
+        In lean mode only revisions that change System.State are kept, each reduced to its rev,
+        revisedDate, System.State and System.ChangedDate. Besides count and value, the payload
+        records the total number of revisions and the latest rev so later fetches can continue
+        where it stopped.
+
         Args:
             work_item_id: The ID of the work item
 
         Returns:
             Dictionary containing the API response with all updates
         """
+        cached = self.cache.get_updates(work_item_id)
+        self.instrumentation.record_cache('updates', cached is not None)
+        if cached is not None:
+            return cached
+
+        stored_rev, stored_updates, current = self._stored_updates(work_item_id)
+        if current:
+            return stored_updates
+
+        # Updates are append-only, so only the ones after the stored history are needed
+        skip = self._revision_count(stored_updates) if stored_updates is not None else 0
+        updates = self._fetch_updates(work_item_id, skip)
+        if updates is None:
+            return {}
+        return self._store_updates(work_item_id, updates, stored_rev, stored_updates)
+
+    def _fetch_updates(self, work_item_id: int, skip: int = 0) -> Optional[Dict]:
+        """
+        Fetch the updates of a work item from the given revision on, one page at a time
+
+        Each page is reduced before the next one is requested, so in lean mode no more than one
+        page of full revisions is held in memory.
+
+        Args:
+            work_item_id: The ID of the work item
+            skip: Number of leading revisions already known
+
+        Returns:
+            Dictionary with value (the kept revisions), count, revisions (number of revisions read)
+            and rev (latest revision read, None if there were none), or None if a request failed
+        """
         url = f"{self.base_url}/wit/workItems/{work_item_id}/updates"
-        params = {
-            'api-version': '7.0'
-        }
+        value = []
+        revisions = 0
+        rev = None
+
+        while True:
+            params = {
+                'api-version': '7.0',
+                '$top': self.UPDATES_PAGE_SIZE
+            }
+            if skip + revisions:
+                params['$skip'] = skip + revisions
 
-        try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching updates for work item {work_item_id}: {e}")
-            return {}
+            try:
+                response = self._get(url, params=params)
+                response.raise_for_status()
+                page = response.json().get('value', [])
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching updates for work item {work_item_id}: {e}")
+                return None
 
-    def count_resolved_transitions(self, work_item_id: int) -> int:
+            revisions += len(page)
+            if page:
+                rev = page[-1].get('rev', rev)
+            if self.lean_updates:
+                value.extend(update for update in map(self._lean_update, page) if update is not None)
+            else:
+                value.extend(page)
+
+            if len(page) < self.UPDATES_PAGE_SIZE:
+                return {'count': len(value), 'value': value, 'revisions': revisions, 'rev': rev}
+
+    def get_state_timeline(self, work_item_id: int) -> StateTimeline:
         """
-        Count how many times a work item has transitioned TO 'Resolved' state
+        Get the (state, timestamp) timeline of a work item, built once from its updates
 
         Args:
             work_item_id: The ID of the work item
 
         Returns:
-            Number of times the item entered 'Resolved' state
+            StateTimeline for the work item (empty if its updates could not be fetched)
         """
-        self.updates = self.get_work_item_updates(work_item_id)
+        timeline = self._load_timeline(work_item_id)
+        return timeline if timeline is not None else StateTimeline()
+
+    def _load_timeline(self, work_item_id: int) -> Optional[StateTimeline]:
+        """The timeline of a work item from the cache or its updates, or None if the fetch failed"""
+        cached = self.cache.get_timeline(work_item_id)
+        self.instrumentation.record_cache('timeline', cached is not None)
+        if cached is not None:
+            return cached
+
+        with self._inflight_lock:
+            # The owner may have cached the timeline and left since the check above
+            cached = self.cache.get_timeline(work_item_id)
+            pending = self._inflight.get(work_item_id)
+            if cached is None and pending is None:
+                future = self._inflight[work_item_id] = Future()
+        if cached is not None:
+            return cached
+        if pending is not None:
+            return pending.result()
 
-        if not self.updates or 'value' not in self.updates:
-            return 0
+        try:
+            timeline = self._build_timeline(work_item_id, self.get_work_item_updates(work_item_id))
+            future.set_result(timeline)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[work_item_id]
+        return timeline
+
+    def get_state_metrics(self, work_item_id: int) -> Dict:
+        """
+        Compute all flow metrics of a work item in one pass over its timeline
 
-        resolved_count = 0
+        Args:
+            work_item_id: The ID of the work item
 
-        for update in self.updates['value']:
-            # Check if this update contains field changes AND Look for State field changes
-            if 'fields' in update and 'System.State' in update['fields']:
-                state_change = update['fields']['System.State']
+        Returns:
+            Dictionary with transition_count, time_in_states, resolved_count, cycle_time and lead_time
+            (see StateTimeline.metrics)
+        """
+        timeline = self.get_state_timeline(work_item_id)
+        details = self.get_work_item_details(work_item_id)
+        return timeline.metrics(created=details.get('created'))
 
-                # Check if the new value is 'Resolved'
-                if 'newValue' in state_change and state_change['newValue'] == 'Resolved':
-                    resolved_count += 1
+    def count_resolved_transitions(self, work_item_id: int) -> int:
+        """
+        Count how many times a work item has transitioned TO 'Resolved' state
 
-        return resolved_count
+        Args:
+            work_item_id: The ID of the work item
+
+        Returns:
+            Number of times the item entered 'Resolved' state
+        """
+        return self.get_state_timeline(work_item_id).metrics()['resolved_count']
 
     def get_work_item_details(self, work_item_id: int) -> Dict:
         """
@@ -98,6 +306,11 @@ class AzureDevOpsHistoryAnalyzer:
         Returns:
             Dictionary with work item details
         """
+        cached = self.cache.get_details(work_item_id)
+        self.instrumentation.record_cache('details', cached is not None)
+        if cached is not None:
+            return cached
+
         url = f"{self.base_url}/wit/workItems/{work_item_id}"
         params = {
             'api-version': '7.0',
@@ -105,30 +318,84 @@ class AzureDevOpsHistoryAnalyzer:
         }
 
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self._get(url, params=params)
             response.raise_for_status()
             data = response.json()
 
-            return {
-                'id': work_item_id,
-                'title': data['fields'].get('System.Title', 'N/A'),
-                'type': data['fields'].get('System.WorkItemType', 'N/A'),
-                'state': data['fields'].get('System.State', 'N/A'),
-                'created': data['fields'].get('System.CreatedDate', 'N/A')
-            }
+            details = self._details_from_fields(work_item_id, data['fields'])
+            self._store_details(work_item_id, details)
+            return details
         except requests.exceptions.RequestException as e:
             print(f"Error fetching details for work item {work_item_id}: {e}")
             return {}
 
-    def get_task_ids(self) -> List[int]:
+    def get_work_items_details_batch(self, work_item_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Get details for many work items through the workitemsbatch endpoint, 200 IDs per request
+
+        Items already in the cache are not requested again.
+
+        Args:
+            work_item_ids: IDs of the work items
+
+        Returns:
+            Dictionary mapping work item ID to its details
+        """
+        results = {}
+        missing = []
+        for work_item_id in work_item_ids:
+            cached = self.cache.get_details(work_item_id)
+            self.instrumentation.record_cache('details', cached is not None)
+            if cached is not None:
+                results[work_item_id] = cached
+            else:
+                missing.append(work_item_id)
+
+        url = f"{self.base_url}/wit/workitemsbatch"
+        params = {
+            'api-version': '7.0'
+        }
+
+        for start in range(0, len(missing), self.BATCH_SIZE):
+            chunk = missing[start:start + self.BATCH_SIZE]
+            body = {
+                'ids': chunk,
+                'fields': self.DETAIL_FIELDS,
+                # Deleted or inaccessible items come back as null instead of failing the whole batch
+                'errorPolicy': 'omit'
+            }
+
+            try:
+                response = self._post(url, body, params=params)
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching details for {len(chunk)} work items: {e}")
+                continue
+
+            for item in data.get('value', []):
+                if not item:
+                    continue
+                details = self._details_from_fields(item['id'], item.get('fields', {}))
+                self._store_details(item['id'], details)
+                results[item['id']] = details
+
+        return results
+
+    def get_task_ids(self, query_id: Optional[str] = None) -> Optional[List[int]]:
         """
-        Get Task IDs from the configured query
+        Get Task IDs from a saved query
+
+        Results over the WIQL size limit are paged through iter_task_ids instead of being truncated.
+
+        Args:
+            query_id: ID of the saved query (defaults to the configured query)
 
         Returns:
-            List with Task IDs
+            List with Task IDs, or None if the query failed
         """
-        api_url = f'https://dev.azure.com/{self.organization}/{self.project}/_apis/wit/wiql/{self.tasks_id_query_id}?api-version=6.0'
-        response = requests.get(api_url, headers=self.headers)
+        api_url = f'{self.base_url}/wit/wiql/{query_id or self.tasks_id_query_id}?api-version=6.0'
+        response = self._get(api_url)
 
         task_ids = []
 
@@ -139,96 +406,228 @@ class AzureDevOpsHistoryAnalyzer:
             work_items = query_result.get('workItems', [])
             for item in work_items:
                 task_ids.append(item['id'])
+
+            if len(task_ids) >= self.WIQL_MAX_RESULTS:
+                print("Query result may be capped, paging through it by ID")
+                task_ids = self._page_saved_query(query_id)
+        elif 'VS402337' in response.text:
+            # The query matches more items than WIQL returns at once
+            print("Query exceeds the WIQL size limit, paging through it by ID")
+            task_ids = self._page_saved_query(query_id)
         else:
             print(f"Error: {response.status_code}")
             print(response.text)
+            return None
         
         return task_ids
 
-    def get_all_tasks(self) -> List[Task]:
+    def _page_saved_query(self, query_id: Optional[str] = None) -> Optional[List[int]]:
+        """All IDs of a saved query, paged by ID, or None if any request failed"""
+        wiql = self.get_query_wiql(query_id)
+        if wiql is None:
+            return None
+        if re.search(r"\bFROM\s+WorkItemLinks\b", wiql, re.IGNORECASE):
+            return self.run_wiql(wiql)
+
+        task_ids = []
+        after_id = 0
+        while True:
+            # Unlike iter_task_ids, a failed page fails the whole result instead of ending it early
+            page = self.run_wiql(self._page_wiql(wiql, after_id), top=self.WIQL_PAGE_SIZE)
+            if page is None:
+                return None
+            task_ids.extend(page)
+            if len(page) < self.WIQL_PAGE_SIZE:
+                return task_ids
+            after_id = page[-1]
+
+    def get_query_wiql(self, query_id: Optional[str] = None) -> Optional[str]:
+        """
+        Get the WIQL text of a saved query
+
+        Args:
+            query_id: ID of the saved query (defaults to the configured query)
+
+        Returns:
+            The WIQL text, or None on error
+        """
+        url = f"{self.base_url}/wit/queries/{query_id or self.tasks_id_query_id}"
+        params = {
+            'api-version': '7.0',
+            '$expand': 'wiql'
+        }
+
+        try:
+            response = self._get(url, params=params)
+            response.raise_for_status()
+            return response.json().get('wiql')
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching query {query_id or self.tasks_id_query_id}: {e}")
+            return None
+
+    def run_wiql(self, wiql: str, top: Optional[int] = None, time_precision: bool = False) -> Optional[List[int]]:
+        """
+        Run an ad-hoc WIQL query
+
+        Args:
+            wiql: The WIQL query text
+            top: Maximum number of work items to return
+            time_precision: Compare dates including their time of day, not just the date
+
+        Returns:
+            List with work item IDs, or None on error
+        """
+        url = f"{self.base_url}/wit/wiql"
+        params = {
+            'api-version': '7.0'
+        }
+        if top is not None:
+            params['$top'] = top
+        if time_precision:
+            params['timePrecision'] = 'true'
+
+        try:
+            response = self._post(url, {'query': wiql}, params=params)
+            response.raise_for_status()
+            return [item['id'] for item in response.json().get('workItems', [])]
+        except requests.exceptions.RequestException as e:
+            print(f"Error running WIQL query: {e}")
+            return None
+
+    def iter_task_ids(self, wiql: Optional[str] = None, page_size: Optional[int] = None) -> Iterator[int]:
+        """
+        Stream Task IDs of a flat query page by page, so results beyond the WIQL size limit are not lost
+
+        Pages are split on ID ranges, so IDs come out in ascending order rather than the query's order.
+
+        Args:
+            wiql: WIQL text to page through (defaults to the configured saved query)
+            page_size: Work items per page
+
+        Yields:
+            Task IDs
+        """
+        page_size = page_size or self.WIQL_PAGE_SIZE
+        if wiql is None:
+            wiql = self.get_query_wiql()
+            if wiql is None:
+                return
+
+        if re.search(r"\bFROM\s+WorkItemLinks\b", wiql, re.IGNORECASE):
+            print("Paging is only supported for flat queries, running it in one request")
+            yield from self.run_wiql(wiql) or []
+            return
+
+        after_id = 0
+        while True:
+            page = self.run_wiql(self._page_wiql(wiql, after_id), top=page_size)
+            if not page:
+                return
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]
+
+    def iter_tasks(self, wiql: Optional[str] = None, page_size: Optional[int] = None,
+                   prefetch: bool = False, max_workers: int = 8) -> Iterator[Task]:
+        """
+        Stream Task objects page by page as the query results arrive
+
+        Details of each page are loaded in bulk before its Tasks are yielded. With prefetch, the
+        page's timelines are fetched in the background while the next page is queried.
+
+        Args:
+            wiql: WIQL text to page through (defaults to the configured saved query)
+            page_size: Work items per page
+            prefetch: Fetch state timelines in the background as pages arrive
+            max_workers: Maximum number of concurrent requests when prefetching
+
+        Yields:
+            Task objects
+        """
+        page_size = page_size or self.WIQL_PAGE_SIZE
+        executor = ThreadPoolExecutor(max_workers=max_workers) if prefetch else None
+        page = []
+
+        def flush(page_ids: List[int]) -> List[Task]:
+            self.get_work_items_details_batch(page_ids)
+            if executor is not None:
+                for work_item_id in page_ids:
+                    executor.submit(self.get_state_timeline, work_item_id)
+            return [Task(work_item_id, self) for work_item_id in page_ids]
+
+        try:
+            for work_item_id in self.iter_task_ids(wiql, page_size=page_size):
+                page.append(work_item_id)
+                if len(page) == page_size:
+                    yield from flush(page)
+                    page = []
+            if page:
+                yield from flush(page)
+        finally:
+            if executor is not None:
+                # A consumer that stops early should not wait for prefetches that never started
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def prefetch(self, task_ids: List[int],
+                 max_workers: int = 8) -> Tuple[Dict[int, Dict], Dict[int, StateTimeline]]:
+        """
+        Fetch details and state timelines for many work items in parallel and store them in the cache
+
+        The results are also returned, so callers do not depend on a bounded cache still holding them.
+
+        Args:
+            task_ids: IDs of the work items to fetch
+            max_workers: Maximum number of concurrent requests
+
+        Returns:
+            Tuple of (details, timelines), each a dictionary keyed by work item ID that only holds
+            the items fetched successfully
+        """
+        # Details come in bulk, updates have no batch endpoint and are fetched per item
+        details = self.get_work_items_details_batch(task_ids)
+        if self.revision_sync is not None:
+            with self.instrumentation.phase('sync_revisions'):
+                self.revision_sync.sync(task_ids)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            timelines = {work_item_id: timeline
+                         for work_item_id, timeline in zip(task_ids, executor.map(self._load_timeline, task_ids))
+                         if timeline is not None}
+        return details, timelines
+
+    def get_all_tasks(self, prefetch: bool = False, max_workers: int = 8, wiql: Optional[str] = None) -> TaskCollection:
         """
         Get all tasks as Task objects
 
+        Details for all tasks are always loaded in bulk. Without prefetching, updates are fetched
+        when first needed, for all tasks of the collection at once.
+
+        Args:
+            prefetch: Fetch details and updates for all tasks up front, in parallel
+            max_workers: Maximum number of concurrent requests when prefetching
+            wiql: Ad-hoc query to run instead of the saved query, e.g. from build_wiql
+
         Returns:
-            List of Task objects
+            TaskCollection of Task objects
         """
-        task_ids = self.get_task_ids()
-        return [Task(task_id, self) for task_id in task_ids]
+        with self.instrumentation.phase('get_all_tasks'):
+            task_ids = (self.get_task_ids() or []) if wiql is None else list(self.iter_task_ids(wiql))
+            tasks = TaskCollection([Task(task_id, self) for task_id in task_ids], self, max_workers=max_workers)
+            # The collection keeps what it loads, so a bounded cache cannot evict it before use
+            if prefetch:
+                tasks.load()
+            else:
+                tasks.load_details()
+            return tasks
 
     def calculate_cycle_time(self, work_item_id: int) -> Optional[float]:
         """Calculate cycle time from first active state to last closed state"""
-        updates = self.get_work_item_updates(work_item_id)
-            
-        if not updates or 'value' not in updates:
-            return None
-        
-        first_active_date = None
-        last_closed_date = None
-        
-        for update in updates['value']:
-            if 'fields' in update and 'System.State' in update['fields']:
-                state_change = update['fields']['System.State']
-                changed_date = update.get('revisedDate')
-                
-                if not changed_date:
-                    continue
-                
-                # Find first transition to Active state
-                if ('newValue' in state_change and 
-                    state_change['newValue'] == "Active" and 
-                    first_active_date is None):
-                    first_active_date = changed_date
-                
-                # Find last transition to Closed state
-                if ('newValue' in state_change and 
-                    state_change['newValue'] == "Closed"):
-                    last_closed_date = changed_date
-        
-        if first_active_date and last_closed_date:
-            try:
-                start_date = datetime.fromisoformat(first_active_date.replace('Z', '+00:00'))
-                end_date = datetime.fromisoformat(last_closed_date.replace('Z', '+00:00'))
-                return (end_date - start_date).total_seconds() / 86400
-            except ValueError as e:
-                print(f"Date parsing error: {e}")
-                return None
-        
-        return None
+        return self.get_state_timeline(work_item_id).metrics()['cycle_time']
 
     def calculate_lead_time(self, work_item_id: int) -> Optional[float]:
         """Calculate lead time from creation date to last closed state"""
-        updates = self.get_work_item_updates(work_item_id)
-        details = self.get_work_item_details(work_item_id)
-        
-        if not updates or 'value' not in updates or not details:
-            return None
-        
-        created_date = details.get('created')
-        last_closed_date = None
-        
-        for update in updates['value']:
-            if 'fields' in update and 'System.State' in update['fields']:
-                state_change = update['fields']['System.State']
-                changed_date = update.get('revisedDate')
-                
-                if not changed_date:
-                    continue
-                
-                # Find last transition to Closed state
-                if ('newValue' in state_change and 
-                    state_change['newValue'] == "Closed"):
-                    last_closed_date = changed_date
-        
-        if created_date and last_closed_date:
-            try:
-                start_date = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
-                end_date = datetime.fromisoformat(last_closed_date.replace('Z', '+00:00'))
-                return (end_date - start_date).total_seconds() / 86400
-            except ValueError as e:
-                print(f"Date parsing error: {e}")
-                return None
-        
-        return None
+        return self.get_state_metrics(work_item_id)['lead_time']
 
     def analyze_state_transitions(self, work_item_id: int) -> Dict:
         """
@@ -242,72 +641,45 @@ class AzureDevOpsHistoryAnalyzer:
             - transition_count: dict with state names as keys and transition counts as values
             - time_in_states: dict with state names as keys and total time in days as values
         """
-        updates = self.get_work_item_updates(work_item_id)
-    
-        if not updates or 'value' not in updates:
-            return {'transition_count': {}, 'time_in_states': {}}
-        
-        transition_count = {}
-        state_history = []
-        now = datetime.now(timezone.utc)
-
-        for update in updates['value']:
-            if 'fields' in update and 'System.State' in update['fields']:
-                state_change = update['fields']['System.State']
-
-                # Try to get ChangedDate from fields, fallback to revisedDate
-                changed_date = (
-                    update['fields'].get('System.ChangedDate') or
-                    update.get('revisedDate')
-                )
-                if isinstance(changed_date, dict):
-                    changed_date = changed_date.get('newValue')
-                else:
-                    changed_date = changed_date
-
-                if 'newValue' in state_change and changed_date:
-                    new_state = state_change['newValue']
-                    try:
-                        timestamp = isoparse(changed_date)
-                        if timestamp <= now:
-                            transition_count[new_state] = transition_count.get(new_state, 0) + 1
-                            state_history.append((new_state, timestamp))
-                    except Exception:
-                        continue
-
-        # Sort by timestamp ascending
-        state_history.sort(key=lambda x: x[1])
-
-        # Calculate time spent in each state
-        time_in_states = {}
-        for i in range(len(state_history)):
-            current_state, current_time = state_history[i]
-            next_time = state_history[i + 1][1] if i + 1 < len(state_history) else now
-
-            duration_days = max(0, (next_time - current_time).total_seconds() / 86400)
-            time_in_states[current_state] = time_in_states.get(current_state, 0) + duration_days
-
+        metrics = self.get_state_timeline(work_item_id).metrics()
         return {
-            'transition_count': transition_count,
-            'time_in_states': time_in_states
+            'transition_count': metrics['transition_count'],
+            'time_in_states': metrics['time_in_states']
         }
     
 
+def parse_query_url(query_url: str) -> Tuple[str, str, Optional[str]]:
+    """
+    Split an Azure DevOps query or project URL into its parts
+
+    Args:
+        query_url: e.g. https://dev.azure.com/<organization>/<project>/_queries/query/<query id>/,
+                   or just https://dev.azure.com/<organization>/<project> for a whole project
+
+    Returns:
+        Tuple of (organization, project, query ID or None for a project URL)
+    """
+    organization = re.search(r"(?<=dev\.azure\.com/)[^/]+", query_url).group(0)
+    project = urllib.parse.unquote(
+        re.search(r"dev\.azure\.com/[^/]+/([^/]+)", query_url).group(1)
+    )
+    query_match = re.search(r"/query/([a-f0-9\-]{36})", query_url)
+    return organization, project, query_match.group(1) if query_match else None
+
+
 def main():
     PAT = PAT_TOKEN
 
     query_url = "https://dev.azure.com/Spica-International/All%20Hours/_queries/query/fd2005c3-8429-4d1f-a01e-40f2beeb21a7/"
-    ORGANIZATION = re.search(r"(?<=dev\.azure\.com/)[^/]+", query_url).group(0)
-    PROJECT = urllib.parse.unquote(
-        re.search(r"dev\.azure\.com/[^/]+/([^/]+)", query_url).group(1)
-    )
-    TASKS_ID_QUERY_ID = re.search(r"/query/([a-f0-9\-]{36})", query_url).group(1)
+    ORGANIZATION, PROJECT, TASKS_ID_QUERY_ID = parse_query_url(query_url)
 
     # Initialize the analyzer
-    analyzer = AzureDevOpsHistoryAnalyzer(ORGANIZATION, PROJECT, PAT, TASKS_ID_QUERY_ID)
+    analyzer = AzureDevOpsHistoryAnalyzer(ORGANIZATION, PROJECT, PAT, TASKS_ID_QUERY_ID,
+                                          history_store=HistoryStore('.cache'), keep_raw_updates=False,
+                                          lean_updates=True)
 
-    # Get all tasks as objects
-    tasks = analyzer.get_all_tasks()
+    # Get all tasks as objects, refetching only items changed since the previous run
+    tasks = DeltaFlowReport(analyzer, '.cache/flow_report.json').run()
     
     # For testing with specific tasks
     #tasks = [Task(47615, analyzer)]
@@ -319,9 +691,11 @@ def main():
         #print(task.cycle_time, task.lead_time)
         #task.print_state_summary()
     
-    visualizer = TaskGraphVisualizer()
+    visualizer = TaskGraphVisualizer(instrumentation=analyzer.instrumentation)
     visualizer.create_stacked_state_comparison_by_task(tasks[0:], save_path="stacked_tasks_comparison.png")
 
+    analyzer.instrumentation.print_summary()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
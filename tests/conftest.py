@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FakeAzureDevOpsServer import FakeAzureDevOpsServer
+from main import AzureDevOpsHistoryAnalyzer
+
+
+@pytest.fixture
+def server():
+    with FakeAzureDevOpsServer(item_count=60, filler_bytes=0) as fake:
+        yield fake
+
+
+@pytest.fixture
+def make_analyzer(server):
+    """Factory for analyzers talking to the fake server, without retries so failures surface at once"""
+    def make(**kwargs):
+        kwargs.setdefault('max_retries', 0)
+        return AzureDevOpsHistoryAnalyzer(server.organization, server.project, 'token', server.query_id,
+                                          host=server.host, **kwargs)
+    return make
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from AsyncAzureDevOpsHistoryAnalyzer import AsyncAzureDevOpsHistoryAnalyzer
+from HistoryStore import HistoryStore
+from Task import Task
+
+
+def make_async_analyzer(server, **kwargs):
+    return AsyncAzureDevOpsHistoryAnalyzer(server.organization, server.project, 'token', server.query_id,
+                                           host=server.host, max_retries=0, **kwargs)
+
+
+def test_concurrent_loads_share_requests(server):
+    async def run():
+        async with make_async_analyzer(server) as analyzer:
+            first = [Task(work_item_id, analyzer) for work_item_id in range(1, 61)]
+            second = [Task(work_item_id, analyzer) for work_item_id in range(1, 61)]
+            await asyncio.gather(analyzer.load_metrics(first), analyzer.load_metrics(second))
+            assert not analyzer._inflight and not analyzer._inflight_details
+            return first, second
+
+    first, second = asyncio.run(run())
+
+    assert server.request_counts['updates'] == 60
+    assert server.request_counts['workitemsbatch'] == 1
+    assert [task.cycle_time for task in first] == [task.cycle_time for task in second]
+
+
+def test_timelines_match_the_sync_analyzer(server, make_analyzer, tmp_path):
+    store = HistoryStore(str(tmp_path / 'store'))
+
+    async def run():
+        async with make_async_analyzer(server, history_store=store) as analyzer:
+            return await analyzer.get_all_tasks()
+
+    try:
+        tasks = asyncio.run(run())
+        server.touch(3, 'Resolved')
+        server.reset_counts()
+        again = asyncio.run(run())
+    finally:
+        store.close()
+
+    # The store answers unchanged items; only the touched one reads its new revision
+    assert server.request_counts['updates'] == 1
+    reference = make_analyzer()
+    assert len(tasks) == 60
+    assert [task.timeline.to_dict() for task in again] == \
+        [reference.get_state_timeline(task.id).to_dict() for task in again]
+
+
+def test_unloaded_task_cannot_load_lazily(server):
+    analyzer = make_async_analyzer(server)
+    task = Task(1, analyzer)
+
+    with pytest.raises(RuntimeError):
+        task.state_info
+
+
+def test_reporting_backend_is_rejected(server):
+    with pytest.raises(ValueError):
+        make_async_analyzer(server, history_backend='reporting')
@@ -0,0 +1,59 @@
+def test_details_are_fetched_in_batches(server, make_analyzer):
+    analyzer = make_analyzer()
+    analyzer.BATCH_SIZE = 25
+
+    details = analyzer.get_work_items_details_batch(list(range(1, 61)))
+
+    assert sorted(details) == list(range(1, 61))
+    assert server.request_counts['workitemsbatch'] == 3
+    assert server.request_counts['workItems'] == 0
+
+
+def test_cached_details_are_not_fetched_again(server, make_analyzer):
+    analyzer = make_analyzer()
+    analyzer.get_work_items_details_batch([1, 2, 3])
+    server.reset_counts()
+
+    analyzer.get_work_items_details_batch([1, 2, 3, 4])
+
+    assert server.request_counts['workitemsbatch'] == 1
+
+
+def test_updates_are_paged(server, make_analyzer):
+    reference = make_analyzer()
+    paged = make_analyzer()
+    paged.UPDATES_PAGE_SIZE = 3
+
+    for work_item_id in (1, 2, 3):
+        expected = reference.get_state_timeline(work_item_id).to_dict()
+        assert paged.get_state_timeline(work_item_id).to_dict() == expected
+
+    pages = sum(len(server.items[work_item_id]['updates']) // 3 + 1 for work_item_id in (1, 2, 3))
+    assert server.request_counts['updates'] == 3 + pages
+
+
+def test_saved_query_over_size_limit_is_paged(server, make_analyzer):
+    server.WIQL_MAX_RESULTS = 40
+    analyzer = make_analyzer()
+    analyzer.WIQL_PAGE_SIZE = 25
+
+    assert analyzer.get_task_ids() == list(range(1, 61))
+    # One rejected saved query, then pages of 25, 25 and 10
+    assert server.request_counts['wiql'] == 4
+
+
+def test_failed_saved_query_returns_none(server, make_analyzer):
+    analyzer = make_analyzer()
+
+    assert analyzer.get_task_ids('unknown-query') is None
+
+
+def test_prefetch_shares_one_timeline_fetch_per_item(server, make_analyzer):
+    analyzer = make_analyzer()
+
+    details, timelines = analyzer.prefetch(list(range(1, 21)), max_workers=4)
+    analyzer.prefetch(list(range(1, 21)), max_workers=4)
+
+    assert sorted(details) == sorted(timelines) == list(range(1, 21))
+    assert server.request_counts['updates'] == 20
+    assert server.request_counts['workitemsbatch'] == 1
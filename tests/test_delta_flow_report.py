@@ -0,0 +1,62 @@
+import requests
+
+from DeltaFlowReport import DeltaFlowReport
+
+
+def test_second_run_refreshes_only_changed_items(server, make_analyzer, tmp_path):
+    state_path = str(tmp_path / 'report.json')
+    first = DeltaFlowReport(make_analyzer(), state_path).run()
+    assert len(first) == 60
+
+    server.touch(4, 'Active')
+    server.reset_counts()
+    report = DeltaFlowReport(make_analyzer(), state_path)
+    tasks = report.run()
+
+    assert report.changed_ids == [4]
+    assert server.request_counts['updates'] == 1
+    assert tasks[3].timeline.states[-1] == 'Active'
+    reference = make_analyzer()
+    assert [task.timeline.to_dict() for task in tasks] == \
+        [reference.get_state_timeline(task.id).to_dict() for task in tasks]
+
+
+def test_failed_query_keeps_the_previous_snapshot(server, make_analyzer, tmp_path):
+    state_path = str(tmp_path / 'report.json')
+    DeltaFlowReport(make_analyzer(), state_path).run()
+
+    analyzer = make_analyzer()
+    get = analyzer._get
+
+    def unavailable(url, params=None):
+        if '/wiql/' in url:
+            response = requests.Response()
+            response.status_code = 503
+            response._content = b'Service Unavailable'
+            return response
+        return get(url, params)
+
+    analyzer._get = unavailable
+    report = DeltaFlowReport(analyzer, state_path)
+    last_sync = report.last_sync
+    tasks = report.run()
+
+    assert len(tasks) == 60
+    assert all(task.state_info is not None for task in tasks)
+    reloaded = DeltaFlowReport(make_analyzer(), state_path)
+    assert len(reloaded.snapshot) == 60
+    assert reloaded.last_sync == last_sync
+
+
+def test_items_that_failed_to_load_are_fetched_next_run(server, make_analyzer, tmp_path):
+    state_path = str(tmp_path / 'report.json')
+    analyzer = make_analyzer()
+    fetch = analyzer._fetch_updates
+    analyzer._fetch_updates = lambda work_item_id, skip=0: None if work_item_id == 3 else fetch(work_item_id, skip)
+    DeltaFlowReport(analyzer, state_path).run()
+
+    report = DeltaFlowReport(make_analyzer(), state_path)
+    assert 3 not in report.snapshot
+    report.run()
+
+    assert report.changed_ids == [3]
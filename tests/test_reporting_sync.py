@@ -0,0 +1,50 @@
+from HistoryStore import HistoryStore
+
+
+def assert_same_timelines(analyzer, reference, work_item_ids):
+    for work_item_id in work_item_ids:
+        assert analyzer.get_state_timeline(work_item_id).to_dict() == \
+            reference.get_state_timeline(work_item_id).to_dict(), work_item_id
+
+
+def test_reporting_timelines_match_updates(server, make_analyzer):
+    analyzer = make_analyzer(history_backend='reporting')
+    analyzer.revision_sync.PAGE_SIZE = 50
+
+    analyzer.prefetch(list(range(1, 61)))
+
+    assert server.request_counts['updates'] == 0
+    assert server.request_counts['reporting'] > 1
+    assert_same_timelines(analyzer, make_analyzer(), range(1, 61))
+
+
+def test_incremental_sync_reads_only_new_revisions(server, make_analyzer, tmp_path):
+    store = HistoryStore(str(tmp_path / 'store'))
+    try:
+        make_analyzer(history_backend='reporting', history_store=store).prefetch(list(range(1, 61)))
+        server.touch(5, 'Active')
+        server.touch(7)
+        server.reset_counts()
+
+        analyzer = make_analyzer(history_backend='reporting', history_store=store)
+        analyzer.prefetch(list(range(1, 61)))
+
+        assert server.request_counts['reporting'] == 1
+        assert server.request_counts['updates'] == 0
+        assert analyzer.get_state_timeline(5).states[-1] == 'Active'
+        assert_same_timelines(analyzer, make_analyzer(), (5, 7, 9))
+    finally:
+        store.close()
+
+
+def test_item_without_base_is_dropped_but_keeps_details(server, make_analyzer):
+    analyzer = make_analyzer(history_backend='reporting', keep_raw_updates=False)
+    analyzer.get_work_items_details_batch([5])
+    analyzer.revision_sync.sync([5])
+    server.touch(5, 'Active')
+
+    analyzer.revision_sync.sync([5])
+
+    assert analyzer.cache.get_details(5) is not None
+    assert analyzer.cache.get_timeline(5) is None
+    assert analyzer.get_state_timeline(5).to_dict() == make_analyzer().get_state_timeline(5).to_dict()